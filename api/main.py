@@ -1,27 +1,86 @@
+import asyncio
+import json
 import os
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
 
-from fastapi import FastAPI, HTTPException
+import httpx
+import weaviate
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
 from dotenv import load_dotenv
+from sqlalchemy import text
 
-from api.models import QueryRequest, QueryResponse, CitationResponse, HealthResponse
-from app.generation import generate_policy_response
-from db.session import engine
+from api.models import (
+    QueryRequest,
+    QueryResponse,
+    CitationResponse,
+    HealthResponse,
+    BatchQueryRequest,
+    BatchQueryResponse
+)
+from app.schemas import PolicyResponse
+from app.generation import generate_policy_response, stream_policy_response, dyn_batcher
+from app.retrieval import HybridRetriever, get_retriever, load_encoder
+from app.tokens import get_encoding
+from db.session import async_engine
 
 load_dotenv()
 
+WEAVIATE_URL = os.getenv("WEAVIATE_URL", "http://localhost:8080")
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+API_WORKERS = int(os.getenv("API_WORKERS", str(os.cpu_count() or 1)))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.encoder = load_encoder()
+    # Load the prompt tokenizer now rather than on the first /query
+    get_encoding()
+    app.state.weaviate = weaviate.Client(url=WEAVIATE_URL)
+    app.state.retriever = HybridRetriever(
+        model=app.state.encoder,
+        weaviate_client=app.state.weaviate
+    )
+    await dyn_batcher.start()
+    yield
+    await dyn_batcher.stop()
+
+
+def get_app_retriever(request: Request) -> HybridRetriever:
+    """Retriever built in lifespan; falls back to the process singleton when lifespan did not run."""
+    retriever = getattr(request.app.state, "retriever", None)
+    return retriever if retriever is not None else get_retriever()
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """GZip responses except server-sent event streams, which must reach the client unbuffered."""
+    
+    def __init__(self, app, minimum_size: int = 500, excluded_paths: tuple = ()):
+        super().__init__(app, minimum_size=minimum_size)
+        self.excluded_paths = set(excluded_paths)
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
 app = FastAPI(
     title="Policy-Aware RAG System",
     description="Grounded answer generation for Google Ads policy compliance queries",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -32,6 +91,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(SelectiveGZipMiddleware, minimum_size=1024, excluded_paths=("/query/stream",))
+
 static_dir = Path(__file__).parent / "static"
 static_dir.mkdir(exist_ok=True)
 app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
@@ -46,8 +107,25 @@ async def root():
     return {"message": "Policy RAG API is running. Visit /docs for API documentation."}
 
 
+async def check_database():
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+def check_vector_db(client: weaviate.Client = None):
+    if client is None:
+        client = weaviate.Client(url=WEAVIATE_URL)
+    client.schema.get()
+
+
+async def check_llm() -> bool:
+    async with httpx.AsyncClient(timeout=2.0) as client:
+        response = await client.get(f"{OLLAMA_HOST}/api/tags")
+    return response.status_code == 200
+
+
 @app.get("/health", response_model=HealthResponse)
-async def health_check():
+async def health_check(request: Request):
     health = {
         "status": "healthy",
         "database": "unknown",
@@ -55,69 +133,76 @@ async def health_check():
         "llm": "unknown"
     }
     
-    try:
-        with engine.connect() as conn:
-            conn.execute("SELECT 1")
-        health["database"] = "connected"
-    except Exception as e:
-        health["database"] = f"error: {str(e)}"
+    client = getattr(request.app.state, "weaviate", None)
+    
+    # Probes run concurrently so a slow dependency costs its own RTT, not the sum
+    db_result, vector_result, llm_result = await asyncio.gather(
+        check_database(),
+        asyncio.to_thread(check_vector_db, client),
+        check_llm(),
+        return_exceptions=True
+    )
+    
+    if isinstance(db_result, Exception):
+        health["database"] = f"error: {str(db_result)}"
         health["status"] = "degraded"
+    else:
+        health["database"] = "connected"
     
-    try:
-        import weaviate
-        weaviate_url = os.getenv("WEAVIATE_URL", "http://localhost:8080")
-        client = weaviate.Client(url=weaviate_url)
-        client.schema.get()
-        health["vector_db"] = "connected"
-    except Exception as e:
-        health["vector_db"] = f"error: {str(e)}"
+    if isinstance(vector_result, Exception):
+        health["vector_db"] = f"error: {str(vector_result)}"
         health["status"] = "degraded"
+    else:
+        health["vector_db"] = "connected"
     
-    try:
-        import requests
-        ollama_url = os.getenv("OLLAMA_HOST", "http://localhost:11434")
-        response = requests.get(f"{ollama_url}/api/tags", timeout=2)
-        if response.status_code == 200:
-            health["llm"] = "connected"
-        else:
-            health["llm"] = "unreachable"
-            health["status"] = "degraded"
-    except Exception as e:
-        health["llm"] = f"error: {str(e)}"
+    if isinstance(llm_result, Exception):
+        health["llm"] = f"error: {str(llm_result)}"
+        health["status"] = "degraded"
+    elif llm_result:
+        health["llm"] = "connected"
+    else:
+        health["llm"] = "unreachable"
         health["status"] = "degraded"
     
     return HealthResponse(**health)
 
 
+def to_query_response(response: PolicyResponse) -> QueryResponse:
+    citations = [
+        CitationResponse(
+            chunk_id=c.chunk_id,
+            policy_path=c.policy_path,
+            doc_id=c.doc_id,
+            doc_url=c.doc_url
+        )
+        for c in response.citations
+    ]
+    
+    return QueryResponse(
+        answer=response.answer,
+        refused=response.refused,
+        citations=citations,
+        refusal_reason=response.refusal_reason,
+        latency_ms=response.latency_ms,
+        num_tokens_generated=response.num_tokens_generated
+    )
+
+
 @app.post("/query", response_model=QueryResponse)
-async def query_policy(request: QueryRequest):
+async def query_policy(
+    request: QueryRequest,
+    retriever: HybridRetriever = Depends(get_app_retriever)
+):
     try:
-        response = generate_policy_response(
+        response = await generate_policy_response(
             query=request.query,
             limit=request.limit,
             region=request.region,
             content_type=request.content_type,
-            policy_source=request.policy_source
-        )
-        
-        citations = [
-            CitationResponse(
-                chunk_id=c.chunk_id,
-                policy_path=c.policy_path,
-                doc_id=c.doc_id,
-                doc_url=c.doc_url
-            )
-            for c in response.citations
-        ]
-        
-        return QueryResponse(
-            answer=response.answer,
-            refused=response.refused,
-            citations=citations,
-            refusal_reason=response.refusal_reason,
-            latency_ms=response.latency_ms,
-            num_tokens_generated=response.num_tokens_generated
+            policy_source=request.policy_source,
+            retriever=retriever
         )
+        return to_query_response(response)
     
     except Exception as e:
         raise HTTPException(
@@ -126,6 +211,76 @@ async def query_policy(request: QueryRequest):
         )
 
 
+@app.post("/batch", response_model=BatchQueryResponse)
+async def batch_query_policy(
+    batch: BatchQueryRequest,
+    retriever: HybridRetriever = Depends(get_app_retriever)
+):
+    """Answer several queries in one call; a failing query is reported as refused without failing the batch."""
+    try:
+        # One encoder pass for the whole batch instead of one per query
+        query_vectors = await asyncio.to_thread(
+            retriever.encode_queries, [r.query for r in batch.requests]
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal processing error: {str(e)}"
+        )
+    
+    results = await asyncio.gather(
+        *[
+            generate_policy_response(
+                query=request.query,
+                limit=request.limit,
+                region=request.region,
+                content_type=request.content_type,
+                policy_source=request.policy_source,
+                retriever=retriever,
+                query_vector=query_vector
+            )
+            for request, query_vector in zip(batch.requests, query_vectors)
+        ],
+        return_exceptions=True
+    )
+    
+    responses = []
+    for result in results:
+        if isinstance(result, Exception):
+            result = PolicyResponse(
+                answer="",
+                refused=True,
+                refusal_reason=f"Internal processing error: {str(result)}"
+            )
+        responses.append(to_query_response(result))
+    
+    return BatchQueryResponse(responses=responses)
+
+
+@app.post("/query/stream")
+async def query_policy_stream(
+    request: QueryRequest,
+    retriever: HybridRetriever = Depends(get_app_retriever)
+):
+    """Server-sent events: `token` events while the answer decodes, then one `done` event with citations."""
+    async def event_stream():
+        try:
+            async for event in stream_policy_response(
+                query=request.query,
+                limit=request.limit,
+                region=request.region,
+                content_type=request.content_type,
+                policy_source=request.policy_source,
+                retriever=retriever
+            ):
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+        except Exception as e:
+            detail = {"detail": f"Internal processing error: {str(e)}"}
+            yield f"event: error\ndata: {json.dumps(detail)}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 if __name__ == "__main__":
     import uvicorn
     
@@ -133,6 +288,8 @@ if __name__ == "__main__":
         "api.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        loop="uvloop",
+        http="httptools",
+        workers=API_WORKERS,
         log_level="info"
     )
@@ -58,6 +58,21 @@ class QueryResponse(BaseModel):
     )
 
 
+class BatchQueryRequest(BaseModel):
+    requests: List[QueryRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=50,
+        description="Queries to answer in one call"
+    )
+
+
+class BatchQueryResponse(BaseModel):
+    responses: List[QueryResponse] = Field(
+        description="One response per request, in request order"
+    )
+
+
 class HealthResponse(BaseModel):
     status: str = Field(description="Service health status")
     database: str = Field(description="PostgreSQL connection status")
@@ -0,0 +1,250 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import weaviate
+
+from app.schemas import Citation, PolicyResponse
+
+QUERY_CACHE_CLASS = "QueryCache"
+EXACT_CACHE_SIZE = 512
+SEMANTIC_CACHE_MAX_DISTANCE = float(os.getenv("SEMANTIC_CACHE_MAX_DISTANCE", "0.05"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+SEMANTIC_CACHE_TOUCH_INTERVAL = float(os.getenv("SEMANTIC_CACHE_TOUCH_INTERVAL", "300"))
+SEMANTIC_CACHE_EVICT_EVERY = int(os.getenv("SEMANTIC_CACHE_EVICT_EVERY", "100"))
+RETRIEVAL_CACHE_MIN_SIMILARITY = float(os.getenv("RETRIEVAL_CACHE_MIN_SIMILARITY", "0.86"))
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", "300"))
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "256"))
+
+QUERY_CACHE_SCHEMA = {
+    "class": QUERY_CACHE_CLASS,
+    "description": "Generated answers keyed by query embedding",
+    "vectorizer": "none",
+    "properties": [
+        {"name": "query", "dataType": ["text"], "description": "Original user query"},
+        {"name": "scope", "dataType": ["text"], "description": "Retrieval parameters the answer was generated with"},
+        {"name": "answer", "dataType": ["text"], "description": "Generated answer with inline citations"},
+        {"name": "citations", "dataType": ["text"], "description": "JSON-encoded citation list"},
+        {"name": "num_tokens_generated", "dataType": ["int"], "description": "Tokens in the answer"},
+        {"name": "last_used", "dataType": ["number"], "description": "Unix time of last hit, used for LRU eviction"}
+    ]
+}
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def cache_scope(
+    limit: int,
+    region: Optional[str] = None,
+    content_type: Optional[str] = None,
+    policy_source: Optional[str] = None
+) -> str:
+    """Encode the retrieval parameters so answers are only reused for identical filters."""
+    filters = (f.strip().lower() if f else "" for f in (region, content_type, policy_source))
+    return "|".join([str(limit), *filters])
+
+
+class ResponseCache:
+    """
+    Two-tier cache for generated policy answers.
+
+    The exact tier is an in-process LRU keyed on the normalized query; the
+    semantic tier stores answers in Weaviate and matches new queries by
+    embedding distance, so paraphrases of a cached question skip the LLM.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = EXACT_CACHE_SIZE,
+        max_distance: float = SEMANTIC_CACHE_MAX_DISTANCE,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        touch_interval: float = SEMANTIC_CACHE_TOUCH_INTERVAL,
+        evict_every: int = SEMANTIC_CACHE_EVICT_EVERY
+    ):
+        self.maxsize = maxsize
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self.evict_every = evict_every
+        self._exact: "OrderedDict[str, PolicyResponse]" = OrderedDict()
+        self._schema_ready = False
+        self._stores_since_evict = 0
+
+    def get(self, key: str) -> Optional[PolicyResponse]:
+        response = self._exact.get(key)
+        if response is not None:
+            self._exact.move_to_end(key)
+        return response
+
+    def put(self, key: str, response: PolicyResponse):
+        self._exact[key] = response
+        self._exact.move_to_end(key)
+        if len(self._exact) > self.maxsize:
+            self._exact.popitem(last=False)
+
+    def clear(self):
+        self._exact.clear()
+
+    def ensure_schema(self, client: weaviate.Client):
+        if self._schema_ready:
+            return
+        if not client.schema.exists(QUERY_CACHE_CLASS):
+            client.schema.create_class(QUERY_CACHE_SCHEMA)
+        self._schema_ready = True
+
+    def lookup(self, client: weaviate.Client, vector: Sequence[float], scope: str) -> Optional[PolicyResponse]:
+        """Return the cached answer closest to vector if it is within max_distance."""
+        self.ensure_schema(client)
+
+        result = client.query.get(
+            QUERY_CACHE_CLASS,
+            ["answer", "citations", "num_tokens_generated", "last_used", "_additional { id distance }"]
+        ).with_near_vector({"vector": list(vector)}).with_where({
+            "path": ["scope"],
+            "operator": "Equal",
+            "valueText": scope
+        }).with_limit(1).do()
+
+        hits = result.get("data", {}).get("Get", {}).get(QUERY_CACHE_CLASS) or []
+        if not hits or hits[0]["_additional"]["distance"] >= self.max_distance:
+            return None
+
+        hit = hits[0]
+        # Eviction only needs a coarse LRU order, so refresh last_used at most once per touch_interval
+        now = time.time()
+        if now - (hit.get("last_used") or 0) >= self.touch_interval:
+            client.data_object.update({"last_used": now}, QUERY_CACHE_CLASS, hit["_additional"]["id"])
+
+        return PolicyResponse(
+            answer=hit["answer"],
+            refused=False,
+            citations=[Citation(**c) for c in json.loads(hit["citations"])],
+            num_tokens_generated=hit["num_tokens_generated"]
+        )
+
+    def store(
+        self,
+        client: weaviate.Client,
+        vector: Sequence[float],
+        scope: str,
+        query: str,
+        response: PolicyResponse
+    ):
+        self.ensure_schema(client)
+
+        client.data_object.create(
+            {
+                "query": query,
+                "scope": scope,
+                "answer": response.answer,
+                "citations": json.dumps([c.to_dict() for c in response.citations]),
+                "num_tokens_generated": response.num_tokens_generated or 0,
+                "last_used": time.time()
+            },
+            QUERY_CACHE_CLASS,
+            vector=list(vector)
+        )
+
+        # Count and trim once per evict_every inserts; QueryCache may overshoot max_entries by that much in between
+        self._stores_since_evict += 1
+        if self._stores_since_evict >= self.evict_every:
+            self._stores_since_evict = 0
+            self._evict(client)
+
+    def _evict(self, client: weaviate.Client):
+        count = client.query.aggregate(QUERY_CACHE_CLASS).with_meta_count().do()
+        total = count["data"]["Aggregate"][QUERY_CACHE_CLASS][0]["meta"]["count"]
+        excess = total - self.max_entries
+        if excess <= 0:
+            return
+
+        result = client.query.get(
+            QUERY_CACHE_CLASS,
+            ["_additional { id }"]
+        ).with_sort({"path": ["last_used"], "order": "asc"}).with_limit(excess).do()
+
+        for entry in result.get("data", {}).get("Get", {}).get(QUERY_CACHE_CLASS) or []:
+            client.data_object.delete(entry["_additional"]["id"], class_name=QUERY_CACHE_CLASS)
+
+
+class RetrievalCache:
+    """
+    In-process semantic cache of ranked retrieval results.
+
+    Every stored query embedding is a centroid for its scope. A new query whose
+    cosine similarity to a centroid reaches min_similarity reuses that
+    centroid's results and skips the vector search; otherwise the caller
+    searches and stores the query as a new centroid. Entries expire after ttl
+    seconds and each scope keeps at most max_entries centroids.
+    """
+
+    def __init__(
+        self,
+        min_similarity: float = RETRIEVAL_CACHE_MIN_SIMILARITY,
+        ttl: float = RETRIEVAL_CACHE_TTL,
+        max_entries: int = RETRIEVAL_CACHE_MAX_ENTRIES
+    ):
+        self.min_similarity = min_similarity
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._scopes: Dict[str, Deque[Tuple[np.ndarray, tuple, float]]] = {}
+        # Contiguous (n, dim) float32 copy of each scope's centroids, rebuilt only after it changes
+        self._matrices: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(vector: Sequence[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def lookup(self, vector: Sequence[float], scope: str) -> Optional[List]:
+        """Return the results of the most similar live centroid in scope, if similar enough."""
+        if self.max_entries <= 0:
+            return None
+
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if not entries:
+                return None
+
+            # One TTL for all entries, so the oldest insertions expire first
+            now = time.monotonic()
+            while entries and entries[0][2] <= now:
+                entries.popleft()
+                self._matrices.pop(scope, None)
+            if not entries:
+                return None
+
+            centroids = self._matrices.get(scope)
+            if centroids is None:
+                centroids = self._matrices[scope] = np.stack([entry[0] for entry in entries])
+            # All centroids are unit vectors, so one matrix-vector product gives every cosine
+            similarities = centroids @ self._unit(vector)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.min_similarity:
+                return None
+            return list(entries[best][1])
+
+    def store(self, vector: Sequence[float], scope: str, results: Sequence):
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            entries = self._scopes.setdefault(scope, deque(maxlen=self.max_entries))
+            entries.append((self._unit(vector), tuple(results), time.monotonic() + self.ttl))
+            self._matrices.pop(scope, None)
+
+    def clear(self):
+        with self._lock:
+            self._scopes.clear()
+            self._matrices.clear()
+
+
+response_cache = ResponseCache()
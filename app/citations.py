@@ -1,21 +1,18 @@
 import re
-from typing import Set, List, Dict
+from typing import AbstractSet, Set, List, Dict
 from app.schemas import Citation
 
 CITATION_PATTERN = re.compile(r"\[SOURCE:([a-f0-9\-]{36})\]")
 
 
 def extract_citations(text: str) -> Set[str]:
-    """Extract citation chunk_ids from LLM response using regex."""
+    """Extract citation chunk_ids from LLM response in a single regex scan."""
     return set(CITATION_PATTERN.findall(text))
 
 
-def validate_citations(cited_ids: Set[str], retrieved_ids: Set[str]) -> bool:
+def validate_citations(cited_ids: Set[str], retrieved_ids: AbstractSet[str]) -> bool:
     """Validate that all citations reference actual retrieved chunks."""
-    if not cited_ids:
-        return False
-    
-    return cited_ids.issubset(retrieved_ids)
+    return bool(cited_ids) and cited_ids <= retrieved_ids
 
 
 def build_citations(cited_ids: Set[str], results: List[Dict]) -> List[Citation]:
@@ -1,26 +1,36 @@
+import asyncio
+import dataclasses
+import json
+import logging
 import os
 import sys
 import time
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional, Set
 
 sys.path.append(str(Path(__file__).parent.parent))
 
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-from langchain_community.llms import Ollama
+import httpx
 
-from app.retrieval import retrieve_policy_chunks
+from app.retrieval import aretrieve_policy_chunks, get_retriever, HybridRetriever
 from app.schemas import PolicyResponse
 from app.citations import extract_citations, validate_citations, build_citations
+from app.cache import response_cache, normalize_query, cache_scope
+from app.tokens import count_tokens
 
 MIN_CONFIDENCE_SCORE = 0.25
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "qwen3:4b")
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "300"))
+LLM_TEMPERATURE = 0.05
+MAX_PROMPT_TOKENS = int(os.getenv("MAX_PROMPT_TOKENS", "3000"))
+LLM_MAX_BATCH_SIZE = int(os.getenv("LLM_MAX_BATCH_SIZE", "8"))
+LLM_MAX_BATCH_DELAY = float(os.getenv("LLM_MAX_BATCH_DELAY", "0.1"))
+NO_SOURCES_REASON = "No relevant policies found for this query."
 
-POLICY_PROMPT = PromptTemplate(
-    input_variables=["question", "sources"],
-    template="""You are a policy compliance assistant for Google Ads.
+logger = logging.getLogger(__name__)
+
+POLICY_PROMPT = """You are a policy compliance assistant for Google Ads.
 
 Answer using ONLY the sources below. Every factual claim MUST include a citation.
 
@@ -35,12 +45,11 @@ Sources:
 {sources}
 
 Answer:"""
-)
 
 
 def should_refuse(results: List[Dict], min_score: float = MIN_CONFIDENCE_SCORE) -> tuple[bool, Optional[str]]:
     if not results:
-        return True, "No relevant policies found for this query."
+        return True, NO_SOURCES_REASON
     
     if results[0]["score"] < min_score:
         return True, f"Insufficient confidence in policy match (score: {results[0]['score']:.2f})."
@@ -49,105 +58,404 @@ def should_refuse(results: List[Dict], min_score: float = MIN_CONFIDENCE_SCORE)
 
 
 def format_sources(results: List[Dict]) -> str:
-    formatted = []
+    return "\n".join(f"SOURCE {r['chunk_id']}:\n{r['chunk_text']}\n" for r in results)
+
+
+def build_prompt(
+    query: str,
+    results: List[Dict],
+    max_tokens: int = MAX_PROMPT_TOKENS
+) -> tuple[str, List[Dict]]:
+    """
+    Format the prompt, dropping the lowest-scored sources until it fits max_tokens.
+    
+    Returns the prompt and the sources it contains; the top source is always kept.
+    """
+    kept = list(results)
+    prompt = POLICY_PROMPT.format(question=query, sources=format_sources(kept))
+    
+    while len(kept) > 1 and count_tokens(prompt) > max_tokens:
+        kept.remove(min(kept, key=lambda r: r["score"]))
+        prompt = POLICY_PROMPT.format(question=query, sources=format_sources(kept))
+    
+    return prompt, kept
+
+
+def get_llm_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(base_url=OLLAMA_HOST, timeout=OLLAMA_TIMEOUT)
+
+
+async def generate_completion(
+    prompt: str,
+    client: Optional[httpx.AsyncClient] = None,
+    model_name: Optional[str] = None
+) -> str:
+    """Run a single non-streaming Ollama generation without blocking the event loop."""
+    payload = {
+        "model": model_name or OLLAMA_MODEL,
+        "prompt": prompt,
+        "stream": False,
+        "options": {"temperature": LLM_TEMPERATURE}
+    }
+    
+    if client is None:
+        async with get_llm_client() as owned_client:
+            response = await owned_client.post("/api/generate", json=payload)
+    else:
+        response = await client.post("/api/generate", json=payload)
+    
+    response.raise_for_status()
+    return response.json()["response"]
+
+
+async def stream_completion(
+    prompt: str,
+    client: Optional[httpx.AsyncClient] = None,
+    model_name: Optional[str] = None
+) -> AsyncIterator[str]:
+    """Yield response fragments from a streaming Ollama generation as they are decoded."""
+    payload = {
+        "model": model_name or OLLAMA_MODEL,
+        "prompt": prompt,
+        "stream": True,
+        "options": {"temperature": LLM_TEMPERATURE}
+    }
+    
+    owned_client = client is None
+    if owned_client:
+        client = get_llm_client()
+    
+    try:
+        async with client.stream("POST", "/api/generate", json=payload) as response:
+            response.raise_for_status()
+            # Ollama streams one JSON object per line
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                part = json.loads(line)
+                if part.get("response"):
+                    yield part["response"]
+                if part.get("done"):
+                    break
+    finally:
+        if owned_client:
+            await client.aclose()
+
+
+class DynBatcher:
+    """
+    Groups concurrent generation requests into batches for Ollama.
+    
+    Requests queue up until max_batch_size is reached or max_delay has
+    passed since the first one arrived; the batch is then fanned out over a
+    shared client so Ollama receives the prompts together.
+    """
+    
+    def __init__(self, max_batch_size: int = LLM_MAX_BATCH_SIZE, max_delay: float = LLM_MAX_BATCH_DELAY):
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+        # Requests taken off the queue for the batch being collected; kept here so stop() can fail them
+        self._pending: List[tuple] = []
+    
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+    
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._client = get_llm_client()
+        self._worker = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        
+        for future, _ in self._pending:
+            if not future.done():
+                future.set_exception(RuntimeError("LLM batcher stopped"))
+        self._pending = []
+        
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        
+        while self._queue is not None and not self._queue.empty():
+            future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("LLM batcher stopped"))
+        
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def process_batched(self, task: Dict) -> str:
+        """Queue a {"prompt": ..., "query": ...} task and wait for its completion."""
+        if not self.running:
+            # No worker (scripts, tests): generate directly
+            return await generate_completion(task["prompt"])
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((future, task))
+        return await future
+    
+    async def _collect_batch(self) -> List[tuple]:
+        loop = asyncio.get_running_loop()
+        batch = self._pending
+        batch.append(await self._queue.get())
+        deadline = loop.time() + self.max_delay
+        
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        
+        self._pending = []
+        return batch
+    
+    async def _run(self):
+        while True:
+            batch = await self._collect_batch()
+            # Keep collecting while this batch is being generated
+            inflight = asyncio.create_task(self._infer(batch))
+            self._inflight.add(inflight)
+            inflight.add_done_callback(self._inflight.discard)
+    
+    async def _infer(self, batch: List[tuple]):
+        outputs = await asyncio.gather(
+            *[generate_completion(task["prompt"], client=self._client) for _, task in batch],
+            return_exceptions=True
+        )
+        
+        for (future, _), output in zip(batch, outputs):
+            if future.done():
+                continue
+            if isinstance(output, BaseException):
+                future.set_exception(output)
+            else:
+                future.set_result(output)
+
+
+dyn_batcher = DynBatcher()
+
+
+def _refusal(reason: str, start_time: float) -> PolicyResponse:
+    latency_ms = (time.time() - start_time) * 1000
+    return PolicyResponse(
+        answer="",
+        refused=True,
+        refusal_reason=reason,
+        latency_ms=latency_ms
+    )
+
+
+async def _cache_lookup(
+    query: str,
+    scope: str,
+    exact_key: str,
+    retriever: HybridRetriever,
+    query_vector: Optional[List[float]] = None
+) -> tuple[Optional[PolicyResponse], Optional[List[float]]]:
+    """Check both cache tiers; returns the hit (if any) and the query embedding for reuse."""
+    cached = response_cache.get(exact_key)
     
-    for result in results:
-        chunk_id = result["chunk_id"]
-        chunk_text = result["chunk_text"]
-        formatted.append(f"SOURCE {chunk_id}:\n{chunk_text}\n")
+    if cached is None:
+        if query_vector is None:
+            query_vector = await asyncio.to_thread(retriever.encode_query, query)
+        try:
+            cached = await asyncio.to_thread(
+                response_cache.lookup, retriever.weaviate_client, query_vector, scope
+            )
+        except Exception:
+            # Semantic cache is best-effort; fall through to full generation
+            logger.warning("Semantic cache lookup failed", exc_info=True)
+            cached = None
+        if cached is not None:
+            response_cache.put(exact_key, cached)
     
-    return "\n".join(formatted)
+    return cached, query_vector
+
+
+async def _cache_store(
+    query: str,
+    scope: str,
+    exact_key: str,
+    query_vector: Optional[List[float]],
+    response: PolicyResponse,
+    retriever: HybridRetriever
+):
+    response_cache.put(exact_key, response)
+    if query_vector is None:
+        return
+    try:
+        await asyncio.to_thread(
+            response_cache.store, retriever.weaviate_client, query_vector, scope, query, response
+        )
+    except Exception:
+        # The answer is already served; a failed write only costs a future cache hit
+        logger.warning("Semantic cache store failed", exc_info=True)
 
 
-def get_llm(model_name: Optional[str] = None) -> Ollama:
-    return Ollama(
-        model=model_name or OLLAMA_MODEL,
-        base_url=OLLAMA_HOST,
-        temperature=0.05,
+def _finalize_answer(answer: str, results: List[Dict], start_time: float) -> PolicyResponse:
+    if answer.strip() == "REFUSE":
+        return _refusal("LLM determined sources insufficient to answer query.", start_time)
+    
+    cited_ids = extract_citations(answer)
+    retrieved_ids = frozenset(r["chunk_id"] for r in results)
+    
+    if not validate_citations(cited_ids, retrieved_ids):
+        return _refusal("Generated response failed citation validation.", start_time)
+    
+    citations = build_citations(cited_ids, results)
+    
+    num_tokens = count_tokens(answer)
+    latency_ms = (time.time() - start_time) * 1000
+    
+    return PolicyResponse(
+        answer=answer,
+        refused=False,
+        citations=citations,
+        latency_ms=latency_ms,
+        num_tokens_generated=num_tokens
     )
 
 
-def generate_policy_response(
+async def generate_policy_response(
     query: str,
-    llm: Optional[Ollama] = None,
     limit: int = 5,
     region: Optional[str] = None,
     content_type: Optional[str] = None,
-    policy_source: Optional[str] = None
+    policy_source: Optional[str] = None,
+    use_cache: bool = True,
+    retriever: Optional[HybridRetriever] = None,
+    query_vector: Optional[List[float]] = None
 ) -> PolicyResponse:
     start_time = time.time()
     
-    results = retrieve_policy_chunks(
+    # A blank query retrieves nothing, so refuse before any cache lookup, encoding or search
+    if not query.strip():
+        return _refusal(NO_SOURCES_REASON, start_time)
+    
+    scope = cache_scope(limit, region, content_type, policy_source)
+    exact_key = f"{scope}|{normalize_query(query)}"
+    
+    if use_cache:
+        # Only the cache needs the retriever here; otherwise aretrieve_policy_chunks resolves its own
+        if retriever is None:
+            retriever = await asyncio.to_thread(get_retriever)
+        cached, query_vector = await _cache_lookup(query, scope, exact_key, retriever, query_vector)
+        if cached is not None:
+            latency_ms = (time.time() - start_time) * 1000
+            return dataclasses.replace(cached, latency_ms=latency_ms)
+    
+    results = await aretrieve_policy_chunks(
         query=query,
         limit=limit,
         region=region,
         content_type=content_type,
-        policy_source=policy_source
+        policy_source=policy_source,
+        query_vector=query_vector,
+        retriever=retriever
     )
     
     refuse, reason = should_refuse(results)
     if refuse:
-        latency_ms = (time.time() - start_time) * 1000
-        return PolicyResponse(
-            answer="",
-            refused=True,
-            refusal_reason=reason,
-            latency_ms=latency_ms
-        )
-    
-    sources_text = format_sources(results)
-    
-    if llm is None:
-        llm = get_llm()
-    
-    chain = LLMChain(llm=llm, prompt=POLICY_PROMPT)
+        return _refusal(reason, start_time)
     
     try:
-        generation_start = time.time()
-        answer = chain.run(question=query, sources=sources_text)
-        generation_time = (time.time() - generation_start) * 1000
+        # Inside the try: the first count_tokens call may have to fetch the tokenizer file
+        prompt, results = build_prompt(query, results)
+        answer = await dyn_batcher.process_batched({"prompt": prompt, "query": query})
     except Exception as e:
-        latency_ms = (time.time() - start_time) * 1000
-        return PolicyResponse(
-            answer="",
-            refused=True,
-            refusal_reason=f"LLM generation failed: {str(e)}",
-            latency_ms=latency_ms
-        )
+        return _refusal(f"LLM generation failed: {str(e)}", start_time)
     
-    if answer.strip() == "REFUSE":
-        latency_ms = (time.time() - start_time) * 1000
-        return PolicyResponse(
-            answer="",
-            refused=True,
-            refusal_reason="LLM determined sources insufficient to answer query.",
-            latency_ms=latency_ms
-        )
+    response = _finalize_answer(answer, results, start_time)
     
-    cited_ids = extract_citations(answer)
-    retrieved_ids = {r["chunk_id"] for r in results}
+    if use_cache and not response.refused:
+        await _cache_store(query, scope, exact_key, query_vector, response, retriever)
     
-    if not validate_citations(cited_ids, retrieved_ids):
-        latency_ms = (time.time() - start_time) * 1000
-        return PolicyResponse(
-            answer="",
-            refused=True,
-            refusal_reason="Generated response failed citation validation.",
-            latency_ms=latency_ms
-        )
+    return response
+
+
+async def stream_policy_response(
+    query: str,
+    limit: int = 5,
+    region: Optional[str] = None,
+    content_type: Optional[str] = None,
+    policy_source: Optional[str] = None,
+    use_cache: bool = True,
+    retriever: Optional[HybridRetriever] = None
+) -> AsyncIterator[Dict]:
+    """
+    Streaming variant of generate_policy_response.
     
-    citations = build_citations(cited_ids, results)
+    Yields {"event": "token", "data": <text>} as Ollama decodes, then exactly one
+    {"event": "done", "data": <PolicyResponse.to_dict()>} once citations have been
+    validated. The final event is authoritative: a streamed answer that fails
+    validation ends with refused=True.
+    """
+    start_time = time.time()
     
-    num_tokens = len(answer.split())
-    latency_ms = (time.time() - start_time) * 1000
+    if not query.strip():
+        yield {"event": "done", "data": _refusal(NO_SOURCES_REASON, start_time).to_dict()}
+        return
     
-    return PolicyResponse(
-        answer=answer,
-        refused=False,
-        citations=citations,
-        latency_ms=latency_ms,
-        num_tokens_generated=num_tokens
+    scope = cache_scope(limit, region, content_type, policy_source)
+    exact_key = f"{scope}|{normalize_query(query)}"
+    query_vector = None
+    
+    if use_cache:
+        # Only the cache needs the retriever here; otherwise aretrieve_policy_chunks resolves its own
+        if retriever is None:
+            retriever = await asyncio.to_thread(get_retriever)
+        cached, query_vector = await _cache_lookup(query, scope, exact_key, retriever)
+        if cached is not None:
+            latency_ms = (time.time() - start_time) * 1000
+            yield {"event": "token", "data": cached.answer}
+            yield {"event": "done", "data": dataclasses.replace(cached, latency_ms=latency_ms).to_dict()}
+            return
+    
+    results = await aretrieve_policy_chunks(
+        query=query,
+        limit=limit,
+        region=region,
+        content_type=content_type,
+        policy_source=policy_source,
+        query_vector=query_vector,
+        retriever=retriever
     )
+    
+    refuse, reason = should_refuse(results)
+    if refuse:
+        yield {"event": "done", "data": _refusal(reason, start_time).to_dict()}
+        return
+    
+    parts = []
+    try:
+        prompt, results = build_prompt(query, results)
+        async for part in stream_completion(prompt):
+            parts.append(part)
+            yield {"event": "token", "data": part}
+    except Exception as e:
+        yield {"event": "done", "data": _refusal(f"LLM generation failed: {str(e)}", start_time).to_dict()}
+        return
+    
+    response = _finalize_answer("".join(parts), results, start_time)
+    
+    if use_cache and not response.refused:
+        await _cache_store(query, scope, exact_key, query_vector, response, retriever)
+    
+    yield {"event": "done", "data": response.to_dict()}
 
 
 if __name__ == "__main__":
@@ -163,7 +471,7 @@ if __name__ == "__main__":
     for i, test_query in enumerate(test_queries, 1):
         print(f"Test {i}/3: {test_query}")
         
-        response = generate_policy_response(test_query, limit=5)
+        response = asyncio.run(generate_policy_response(test_query, limit=5))
         
         print(f"Refused: {response.refused}")
         
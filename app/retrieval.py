@@ -1,7 +1,17 @@
+import asyncio
+import dataclasses
+import threading
+import time
+import httpx
+import json
+import numpy as np
+import torch
 import weaviate
+from collections import OrderedDict
+from functools import lru_cache
 from sentence_transformers import SentenceTransformer
-from sqlalchemy.orm import Session
-from typing import List, Dict, Optional
+from weaviate.gql.filter import Where
+from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 import sys
 import os
@@ -9,20 +19,115 @@ from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
 
-from db.session import SessionLocal
-from db.models import PolicyChunk, PolicySource, Region, ContentType
+from db.models import PolicySource, Region, ContentType
+from app.cache import RetrievalCache, cache_scope
 
 WEAVIATE_URL = os.getenv("WEAVIATE_URL", "http://localhost:8080")
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# "onnx" and "openvino" run int8-quantized exports; "torch" keeps the FP32 PyTorch model
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "onnx")
+# Use onnx/model_quint8_avx2.onnx on CPUs without AVX-512 VNNI
+ONNX_MODEL_FILE = os.getenv("ONNX_MODEL_FILE", "onnx/model_qint8_avx512_vnni.onnx")
+OPENVINO_MODEL_FILE = os.getenv("OPENVINO_MODEL_FILE", "openvino/openvino_model_qint8_quantized.xml")
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "512"))
+# Intra-op threads for the encoder backend; 0 keeps the backend default (one per core)
+ENCODER_THREADS = int(os.getenv("ENCODER_THREADS", "0"))
+# MiniLM truncates at 256 tokens and every whitespace-separated word is at least one token,
+# so words past the 256th can never reach the model
+MAX_QUERY_WORDS = 256
+# How long a PolicyChunk object count is trusted before it is re-read (re-ingestion changes it)
+CORPUS_SIZE_TTL = float(os.getenv("CORPUS_SIZE_TTL", "300"))
+CORPUS_SIZE_GRAPHQL = "{Aggregate{PolicyChunk{meta{count}}}}"
 
 _retriever_instance = None
 
+def load_encoder(
+    model_name: str = EMBEDDING_MODEL,
+    backend: str = EMBEDDING_BACKEND,
+    num_threads: int = ENCODER_THREADS
+) -> SentenceTransformer:
+    # Each backend has its own thread pool, so the cap is applied through that backend's own setting
+    if backend == "onnx":
+        model_kwargs = {"file_name": ONNX_MODEL_FILE, "provider": "CPUExecutionProvider"}
+        if num_threads:
+            import onnxruntime
+            session_options = onnxruntime.SessionOptions()
+            session_options.intra_op_num_threads = num_threads
+            model_kwargs["session_options"] = session_options
+        encoder = SentenceTransformer(model_name, backend="onnx", model_kwargs=model_kwargs)
+    elif backend == "openvino":
+        model_kwargs = {"file_name": OPENVINO_MODEL_FILE}
+        if num_threads:
+            model_kwargs["ov_config"] = {"INFERENCE_NUM_THREADS": str(num_threads)}
+        encoder = SentenceTransformer(model_name, backend="openvino", model_kwargs=model_kwargs)
+    elif torch.cuda.is_available():
+        # Half precision on GPU: half the bytes per MatMul, negligible cosine drift for MiniLM
+        encoder = SentenceTransformer(model_name, device="cuda")
+        encoder.half()
+    else:
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        encoder = SentenceTransformer(model_name)
+    
+    # First forward pass allocates buffers; pay it at startup, not on the first query
+    encoder.encode("warmup")
+    return encoder
+
 def get_retriever() -> 'HybridRetriever':
     global _retriever_instance
     if _retriever_instance is None:
         _retriever_instance = HybridRetriever()
     return _retriever_instance
 
+@lru_cache(maxsize=256)
+def build_where_filter(
+    region: Optional[str] = None,
+    content_type: Optional[str] = None,
+    policy_source: Optional[str] = None
+) -> Optional[Dict]:
+    """
+    Validate the filters and build the Weaviate where clause once per distinct
+    combination; the returned dict is shared between calls and must not be mutated.
+    """
+    operands = []
+    
+    if region:
+        region_enum = Region(region.strip().lower())
+        operands.append({"path": ["region"], "operator": "Equal", "valueText": region_enum.value})
+    
+    if content_type:
+        content_type_enum = ContentType(content_type.strip().lower())
+        operands.append({"path": ["content_type"], "operator": "Equal", "valueText": content_type_enum.value})
+    
+    if policy_source:
+        policy_source_enum = PolicySource(policy_source.strip().lower())
+        operands.append({"path": ["policy_source"], "operator": "Equal", "valueText": policy_source_enum.value})
+    
+    if not operands:
+        return None
+    if len(operands) == 1:
+        return operands[0]
+    return {"operator": "And", "operands": operands}
+
+QUERY_FIELDS = (
+    "chunk_id chunk_text policy_section policy_path policy_section_level "
+    "doc_id doc_url policy_source region content_type _additional { distance }"
+)
+
+@lru_cache(maxsize=256)
+def graphql_template(
+    region: Optional[str] = None,
+    content_type: Optional[str] = None,
+    policy_source: Optional[str] = None
+) -> Tuple[str, str]:
+    """
+    Render the parts of the vector search GraphQL that depend only on the
+    filters, once per combination; limit and vector are spliced in per call.
+    """
+    where = build_where_filter(region, content_type, policy_source)
+    where_clause = str(Where(where)) if where is not None else ""
+    return f"{{Get{{PolicyChunk({where_clause}", f"){{{QUERY_FIELDS}}}}}}}"
+
 @dataclass
 class RetrievalResult:
     chunk_id: str
@@ -53,63 +158,164 @@ class RetrievalResult:
         }
 
 class HybridRetriever:
-    def __init__(self, model_name: str = EMBEDDING_MODEL):
-        self.model = SentenceTransformer(model_name)
-        self.weaviate_client = weaviate.Client(url=WEAVIATE_URL)
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL,
+        model: Optional[SentenceTransformer] = None,
+        weaviate_client: Optional[weaviate.Client] = None,
+        weaviate_url: str = WEAVIATE_URL,
+        result_cache: Optional[RetrievalCache] = None
+    ):
+        self.model = model if model is not None else load_encoder(model_name)
+        self.weaviate_client = weaviate_client if weaviate_client is not None else weaviate.Client(url=weaviate_url)
+        self.graphql_url = f"{weaviate_url.rstrip('/')}/v1/graphql"
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._http_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Per instance, so a retriever built on another model never sees these vectors
+        # Vectors are kept as float32 arrays (1.5 KB each) rather than lists of Python floats (~12 KB)
+        self._query_vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._query_vectors_lock = threading.Lock()
+        self.result_cache = result_cache if result_cache is not None else RetrievalCache()
+        self._corpus_size: Optional[int] = None
+        self._corpus_size_expires = 0.0
+    
+    @staticmethod
+    def _query_key(query: str) -> str:
+        # MiniLM's tokenizer is uncased and splits on whitespace first, so lowercasing, collapsing
+        # whitespace and dropping words beyond the token window never change the vector; they
+        # raise the hit rate and keep very long inputs from being tokenized in full
+        return " ".join(query.lower().split()[:MAX_QUERY_WORDS])
+    
+    def _cached_vector(self, key: str) -> Optional[np.ndarray]:
+        with self._query_vectors_lock:
+            vector = self._query_vectors.get(key)
+            if vector is not None:
+                self._query_vectors.move_to_end(key)
+            return vector
+    
+    def _remember_vector(self, key: str, vector: np.ndarray):
+        vector = np.array(vector, dtype=np.float32)
+        vector.flags.writeable = False
+        with self._query_vectors_lock:
+            self._query_vectors[key] = vector
+            self._query_vectors.move_to_end(key)
+            if len(self._query_vectors) > QUERY_EMBEDDING_CACHE_SIZE:
+                self._query_vectors.popitem(last=False)
+    
+    def encode_query(self, query: str) -> List[float]:
+        key = self._query_key(query)
+        vector = self._cached_vector(key)
+        if vector is None:
+            vector = self.model.encode(key)
+            self._remember_vector(key, vector)
+        return vector.tolist()
+    
+    def encode_queries(self, queries: List[str], batch_size: int = 32) -> List[List[float]]:
+        """
+        Encode several queries, running only the uncached ones through the model
+        in one forward pass per batch_size queries. The new vectors are cached.
+        """
+        if not queries:
+            return []
+        
+        keys = [self._query_key(query) for query in queries]
+        vectors = {key: self._cached_vector(key) for key in keys}
+        missing = [key for key, vector in vectors.items() if vector is None]
+        
+        if missing:
+            for key, vector in zip(missing, self.model.encode(missing, batch_size=batch_size)):
+                vectors[key] = vector
+                self._remember_vector(key, vector)
+        
+        return [vectors[key].tolist() for key in keys]
+    
+    def _graphql(
+        self,
+        query_vector: List[float],
+        limit: int,
+        region: Optional[str] = None,
+        content_type: Optional[str] = None,
+        policy_source: Optional[str] = None
+    ) -> str:
+        # Filters are applied inside Weaviate's filtered HNSW search, not after it
+        prefix, suffix = graphql_template(region, content_type, policy_source)
+        return f"{prefix}limit: {int(limit)} nearVector: {{vector: {json.dumps(query_vector)}}} {suffix}"
+    
+    def _remember_corpus_size(self, result: Dict) -> int:
+        if result.get("errors"):
+            raise RuntimeError(f"Weaviate aggregate failed: {result['errors']}")
+        self._corpus_size = result["data"]["Aggregate"]["PolicyChunk"][0]["meta"]["count"]
+        self._corpus_size_expires = time.monotonic() + CORPUS_SIZE_TTL
+        return self._corpus_size
+    
+    def corpus_size(self) -> int:
+        """Number of indexed chunks, re-counted at most every CORPUS_SIZE_TTL seconds."""
+        if self._corpus_size is not None and time.monotonic() < self._corpus_size_expires:
+            return self._corpus_size
+        return self._remember_corpus_size(self.weaviate_client.query.raw(CORPUS_SIZE_GRAPHQL))
+    
+    async def acorpus_size(self) -> int:
+        if self._corpus_size is not None and time.monotonic() < self._corpus_size_expires:
+            return self._corpus_size
+        response = await self._http().post(self.graphql_url, json={"query": CORPUS_SIZE_GRAPHQL})
+        response.raise_for_status()
+        return self._remember_corpus_size(response.json())
+    
+    def _http(self) -> httpx.AsyncClient:
+        # Pooled connections belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._http_client is None or self._http_loop is not loop:
+            self._http_client = httpx.AsyncClient(timeout=10.0)
+            self._http_loop = loop
+        return self._http_client
     
     def vector_search(
         self,
         query: str,
-        limit: int = 10
+        limit: int = 10,
+        query_vector: Optional[List[float]] = None,
+        region: Optional[str] = None,
+        content_type: Optional[str] = None,
+        policy_source: Optional[str] = None
     ) -> List[Dict]:
-        query_vector = self.model.encode(query).tolist()
-        
-        query_builder = self.weaviate_client.query.get(
-            "PolicyChunk",
-            [
-                "chunk_id",
-                "chunk_text",
-                "policy_section",
-                "policy_path",
-                "policy_section_level",
-                "doc_id",
-                "doc_url",
-                "policy_source",
-                "region",
-                "content_type",
-                "_additional { distance }"
-            ]
-        ).with_near_vector({"vector": query_vector}).with_limit(limit)
-        
-        result = query_builder.do()
+        # Resolving the template validates the filters before any encoding work
+        graphql_template(region, content_type, policy_source)
+        
+        if query_vector is None:
+            query_vector = self.encode_query(query)
+        
+        result = self.weaviate_client.query.raw(
+            self._graphql(query_vector, limit, region, content_type, policy_source)
+        )
         
         chunks = result.get("data", {}).get("Get", {}).get("PolicyChunk", [])
         return chunks
     
-    def sql_filter(
+    async def avector_search(
         self,
-        db: Session,
-        chunk_ids: List[str],
+        query: str,
+        limit: int = 10,
+        query_vector: Optional[List[float]] = None,
         region: Optional[str] = None,
         content_type: Optional[str] = None,
         policy_source: Optional[str] = None
-    ) -> List[PolicyChunk]:
-        query = db.query(PolicyChunk).filter(PolicyChunk.chunk_id.in_(chunk_ids))
+    ) -> List[Dict]:
+        graphql_template(region, content_type, policy_source)
         
-        if region:
-            region_enum = Region(region.strip().lower())
-            query = query.filter(PolicyChunk.region == region_enum)
+        if query_vector is None:
+            query_vector = await asyncio.to_thread(self.encode_query, query)
         
-        if content_type:
-            content_type_enum = ContentType(content_type.strip().lower())
-            query = query.filter(PolicyChunk.content_type == content_type_enum)
+        # Same GraphQL as the sync path, sent without blocking the loop
+        graphql = self._graphql(query_vector, limit, region, content_type, policy_source)
+        response = await self._http().post(self.graphql_url, json={"query": graphql})
+        response.raise_for_status()
+        result = response.json()
         
-        if policy_source:
-            policy_source_enum = PolicySource(policy_source.strip().lower())
-            query = query.filter(PolicyChunk.policy_source == policy_source_enum)
+        if result.get("errors"):
+            raise RuntimeError(f"Weaviate query failed: {result['errors']}")
         
-        # Preserve vector ranking; SQL used only as a filter
-        return query.all()
+        chunks = result.get("data", {}).get("Get", {}).get("PolicyChunk", [])
+        return chunks
     
     def retrieve(
         self,
@@ -118,79 +324,184 @@ class HybridRetriever:
         region: Optional[str] = None,
         content_type: Optional[str] = None,
         policy_source: Optional[str] = None,
-        prefer_specific: bool = True
+        prefer_specific: bool = True,
+        query_vector: Optional[List[float]] = None
     ) -> List[RetrievalResult]:
         if limit <= 0:
             return []
         
-        overfetch_limit = limit * 3
+        # Validates the filters (cached per combination) before any model or index work
+        graphql_template(region, content_type, policy_source)
+        
+        if not query.strip():
+            return []
+        
+        # Never ask the index for more neighbours than it holds
+        limit = min(limit, self.corpus_size())
+        if limit == 0:
+            return []
+        
+        if query_vector is None:
+            query_vector = self.encode_query(query)
+        
+        scope = self._result_scope(limit, region, content_type, policy_source, prefer_specific)
+        cached = self.result_cache.lookup(query_vector, scope)
+        if cached is not None:
+            return cached
         
         vector_results = self.vector_search(
             query=query,
-            limit=overfetch_limit
+            limit=limit,
+            query_vector=query_vector,
+            region=region,
+            content_type=content_type,
+            policy_source=policy_source
+        )
+        
+        results = self._build_results(vector_results, limit, prefer_specific)
+        self.result_cache.store(query_vector, scope, results)
+        return results
+    
+    async def aretrieve(
+        self,
+        query: str,
+        limit: int = 5,
+        region: Optional[str] = None,
+        content_type: Optional[str] = None,
+        policy_source: Optional[str] = None,
+        prefer_specific: bool = True,
+        query_vector: Optional[List[float]] = None
+    ) -> List[RetrievalResult]:
+        if limit <= 0:
+            return []
+        
+        # Validates the filters (cached per combination) before any model or index work
+        graphql_template(region, content_type, policy_source)
+        
+        if not query.strip():
+            return []
+        
+        # Never ask the index for more neighbours than it holds
+        limit = min(limit, await self.acorpus_size())
+        if limit == 0:
+            return []
+        
+        if query_vector is None:
+            query_vector = await asyncio.to_thread(self.encode_query, query)
+        
+        scope = self._result_scope(limit, region, content_type, policy_source, prefer_specific)
+        cached = self.result_cache.lookup(query_vector, scope)
+        if cached is not None:
+            return cached
+        
+        vector_results = await self.avector_search(
+            query=query,
+            limit=limit,
+            query_vector=query_vector,
+            region=region,
+            content_type=content_type,
+            policy_source=policy_source
         )
         
+        results = self._build_results(vector_results, limit, prefer_specific)
+        self.result_cache.store(query_vector, scope, results)
+        return results
+    
+    def _result_scope(
+        self,
+        limit: int,
+        region: Optional[str],
+        content_type: Optional[str],
+        policy_source: Optional[str],
+        prefer_specific: bool
+    ) -> str:
+        return f"{cache_scope(limit, region, content_type, policy_source)}|{int(prefer_specific)}"
+    
+    def _build_results(
+        self,
+        vector_results: List[Dict],
+        limit: int,
+        prefer_specific: bool
+    ) -> List[RetrievalResult]:
         if not vector_results:
             return []
         
-        chunk_ids = [chunk["chunk_id"] for chunk in vector_results]
-        
-        db = SessionLocal()
-        try:
-            sql_results = self.sql_filter(
-                db=db,
-                chunk_ids=chunk_ids,
-                region=region,
-                content_type=content_type,
-                policy_source=policy_source
-            )
-            
-            sql_chunk_map = {str(chunk.chunk_id): chunk for chunk in sql_results}
-            
-            results = []
-            for chunk in vector_results:
-                chunk_id = chunk["chunk_id"]
-                if chunk_id not in sql_chunk_map:
-                    continue
-                
-                distance = chunk["_additional"]["distance"]
-                score = 1 / (1 + distance)
-                
-                result = RetrievalResult(
-                    chunk_id=chunk_id,
-                    chunk_text=chunk["chunk_text"],
-                    policy_section=chunk["policy_section"],
-                    policy_path=chunk["policy_path"],
-                    policy_section_level=chunk["policy_section_level"],
-                    doc_id=chunk["doc_id"],
-                    doc_url=chunk.get("doc_url", ""),
-                    policy_source=chunk["policy_source"],
-                    region=chunk["region"],
-                    content_type=chunk["content_type"],
-                    score=score
-                )
-                results.append(result)
-            
-            results = self.rerank_by_hierarchy(results, prefer_specific=prefer_specific)
-            
-            return results[:limit]
-        finally:
-            db.close()
+        # Rank on the two columns the score depends on; only the top `limit` rows become objects
+        distances = np.fromiter(
+            (chunk["_additional"]["distance"] for chunk in vector_results),
+            dtype=np.float64,
+            count=len(vector_results)
+        )
+        levels = [chunk["policy_section_level"] for chunk in vector_results]
+        adjusted = _hierarchy_scores(1.0 / (1.0 + distances), levels, prefer_specific)
+        
+        results = []
+        for i in _top_k(adjusted, limit):
+            chunk = vector_results[i]
+            results.append(RetrievalResult(
+                chunk_id=chunk["chunk_id"],
+                chunk_text=chunk["chunk_text"],
+                policy_section=chunk["policy_section"],
+                policy_path=chunk["policy_path"],
+                policy_section_level=chunk["policy_section_level"],
+                doc_id=chunk["doc_id"],
+                doc_url=chunk.get("doc_url", ""),
+                policy_source=chunk["policy_source"],
+                region=chunk["region"],
+                content_type=chunk["content_type"],
+                score=float(adjusted[i])
+            ))
+        
+        return results
     
     def rerank_by_hierarchy(
         self,
         results: List[RetrievalResult],
-        prefer_specific: bool = True
+        prefer_specific: bool = True,
+        limit: Optional[int] = None,
+        scores: Optional[np.ndarray] = None
     ) -> List[RetrievalResult]:
-        h3_boost = 0.1 if prefer_specific else -0.1
+        if not results:
+            return []
         
-        for result in results:
-            if result.policy_section_level == "H3":
-                result.score += h3_boost
-            elif result.policy_section_level == "H2":
-                result.score -= h3_boost
+        # Callers that already hold the score array skip rebuilding it from the results
+        if scores is None:
+            scores = np.fromiter((r.score for r in results), dtype=np.float64, count=len(results))
+        levels = [r.policy_section_level for r in results]
+        adjusted = _hierarchy_scores(scores, levels, prefer_specific)
         
-        return sorted(results, key=lambda x: x.score, reverse=True)
+        order = _top_k(adjusted, limit)
+        
+        return [dataclasses.replace(results[i], score=float(adjusted[i])) for i in order]
+
+# Section levels as int8 codes; anything else (H1, H4, missing) maps to 0 and gets no boost
+LEVEL_CODES = {"H2": 2, "H3": 3}
+H3_BOOST = 0.1
+
+def _hierarchy_scores(scores: np.ndarray, levels: List[str], prefer_specific: bool) -> np.ndarray:
+    h3_boost = H3_BOOST if prefer_specific else -H3_BOOST
+    # One gather from a per-code boost table instead of a comparison and select per level
+    boost = np.array([0.0, 0.0, -h3_boost, h3_boost])
+    codes = np.fromiter((LEVEL_CODES.get(level, 0) for level in levels), dtype=np.int8, count=len(levels))
+    return scores + boost[codes]
+
+def _top_k(scores: np.ndarray, k: Optional[int]) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first; equal scores keep their input
+    (Weaviate) order, exactly as a stable descending sort truncated to k would.
+    """
+    n = len(scores)
+    if k is None or k >= n:
+        return np.argsort(-scores, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    
+    # O(n) selection of the k-th best score, then order only the candidates at or above it
+    # (ties at the cut-off are all kept so the earliest ones win, as in the stable sort)
+    kth = -np.partition(-scores, k - 1)[k - 1]
+    candidates = np.flatnonzero(scores >= kth)
+    order = candidates[np.lexsort((candidates, -scores[candidates]))]
+    return order[:k]
 
 def retrieve_policy_chunks(
     query: str,
@@ -198,9 +509,12 @@ def retrieve_policy_chunks(
     region: Optional[str] = None,
     content_type: Optional[str] = None,
     policy_source: Optional[str] = None,
-    prefer_specific: bool = True
+    prefer_specific: bool = True,
+    query_vector: Optional[List[float]] = None,
+    retriever: Optional[HybridRetriever] = None
 ) -> List[Dict]:
-    retriever = get_retriever()
+    if retriever is None:
+        retriever = get_retriever()
     
     results = retriever.retrieve(
         query=query,
@@ -208,7 +522,62 @@ def retrieve_policy_chunks(
         region=region,
         content_type=content_type,
         policy_source=policy_source,
-        prefer_specific=prefer_specific
+        prefer_specific=prefer_specific,
+        query_vector=query_vector
+    )
+    
+    return [result.to_dict() for result in results]
+
+def retrieve_policy_chunks_batch(
+    queries: List[str],
+    limit: int = 5,
+    region: Optional[str] = None,
+    content_type: Optional[str] = None,
+    policy_source: Optional[str] = None,
+    prefer_specific: bool = True,
+    retriever: Optional[HybridRetriever] = None
+) -> List[List[Dict]]:
+    """Retrieve for several queries with one batched encoder pass; results follow the input order."""
+    if retriever is None:
+        retriever = get_retriever()
+    
+    query_vectors = retriever.encode_queries(queries)
+    
+    return [
+        retrieve_policy_chunks(
+            query,
+            limit=limit,
+            region=region,
+            content_type=content_type,
+            policy_source=policy_source,
+            prefer_specific=prefer_specific,
+            query_vector=query_vector,
+            retriever=retriever
+        )
+        for query, query_vector in zip(queries, query_vectors)
+    ]
+
+async def aretrieve_policy_chunks(
+    query: str,
+    limit: int = 5,
+    region: Optional[str] = None,
+    content_type: Optional[str] = None,
+    policy_source: Optional[str] = None,
+    prefer_specific: bool = True,
+    query_vector: Optional[List[float]] = None,
+    retriever: Optional[HybridRetriever] = None
+) -> List[Dict]:
+    if retriever is None:
+        retriever = await asyncio.to_thread(get_retriever)
+    
+    results = await retriever.aretrieve(
+        query=query,
+        limit=limit,
+        region=region,
+        content_type=content_type,
+        policy_source=policy_source,
+        prefer_specific=prefer_specific,
+        query_vector=query_vector
     )
     
     return [result.to_dict() for result in results]
@@ -0,0 +1,16 @@
+from functools import lru_cache
+
+import tiktoken
+
+TOKEN_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=1)
+def get_encoding() -> tiktoken.Encoding:
+    # tiktoken downloads the BPE file unless TIKTOKEN_CACHE_DIR already holds it;
+    # the Docker image pre-fetches it and the API lifespan warms it at startup
+    return tiktoken.get_encoding(TOKEN_ENCODING)
+
+
+def count_tokens(text: str) -> int:
+    return len(get_encoding().encode(text))
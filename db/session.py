@@ -1,6 +1,7 @@
 import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine
 from dotenv import load_dotenv
 from db.models import Base
 
@@ -14,6 +15,28 @@ DATABASE_URL = os.getenv(
 engine = create_engine(DATABASE_URL, echo=False)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the API's /health database check (asyncpg driver)
+ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Set to "pgbouncer" when DATABASE_URL points at PgBouncer in transaction pooling mode
+DATABASE_POOLER = os.getenv("DATABASE_POOLER", "")
+
+# Transaction pooling hands each transaction to any server connection,
+# so asyncpg's per-connection prepared statement cache must be off
+async_connect_args = {"statement_cache_size": 0} if DATABASE_POOLER == "pgbouncer" else {}
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=False,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=True,
+    connect_args=async_connect_args
+)
+
 def get_db():
     db = SessionLocal()
     try:
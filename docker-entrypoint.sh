@@ -73,4 +73,5 @@ fi
 echo "Starting FastAPI server..."
 
 # Start the FastAPI application
-exec uvicorn api.main:app --host 0.0.0.0 --port 8000
+exec uvicorn api.main:app --host 0.0.0.0 --port 8000 \
+  --loop uvloop --http httptools --workers "${API_WORKERS:-$(nproc)}"
@@ -1,9 +1,17 @@
 import json
 import re
+import sys
 import uuid
 from pathlib import Path
 from typing import List, Dict
 
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.tokens import count_tokens
+
+SECTION_RE = re.compile(r'^\[SECTION-(H2|H3)\]\s+(.+)$')
+H1_PREFIX = '[SECTION-H1]'
+
 def get_policy_url(section_name: str, metadata: Dict) -> str:
     """
     Returns the specific policy URL for a section from metadata,
@@ -44,10 +52,9 @@ def extract_sections(content: str) -> List[Dict]:
     section_stack = []
     
     for line in lines:
-        h2_match = re.match(r'\[SECTION-H2\]\s+(.+)', line)
-        h3_match = re.match(r'\[SECTION-H3\]\s+(.+)', line)
+        match = SECTION_RE.match(line)
         
-        if h2_match:
+        if match:
             if current_section and current_text:
                 sections.append({
                     'section': current_section,
@@ -56,27 +63,17 @@ def extract_sections(content: str) -> List[Dict]:
                     'text': '\n'.join(current_text).strip()
                 })
             
-            current_section = h2_match.group(1)
-            current_level = 'H2'
-            section_stack = [current_section]
-            current_text = []
-        
-        elif h3_match:
-            if current_section and current_text:
-                sections.append({
-                    'section': current_section,
-                    'level': current_level,
-                    'hierarchy': list(section_stack),
-                    'text': '\n'.join(current_text).strip()
-                })
+            level, title = match.group(1), match.group(2)
+            if level == 'H2':
+                section_stack = [title]
+            else:
+                section_stack = [section_stack[0] if section_stack else '', title]
             
-            h3_title = h3_match.group(1)
-            section_stack = [section_stack[0] if section_stack else '', h3_title]
-            current_section = h3_title
-            current_level = 'H3'
+            current_section = title
+            current_level = level
             current_text = []
         
-        elif line.strip() and not line.startswith('[SECTION-H1]'):
+        elif line.strip() and not line.startswith(H1_PREFIX):
             current_text.append(line)
     
     if current_section and current_text:
@@ -107,15 +104,13 @@ def create_chunks(sections: List[Dict], metadata: Dict, max_tokens: int = 500) -
         # Get section-specific URL from metadata or fall back to document URL
         section_url = get_policy_url(section['section'], metadata)
         
-        estimated_tokens = len(chunk_text.split()) / 0.75
-        
-        if estimated_tokens > max_tokens:
+        if count_tokens(chunk_text) > max_tokens:
             paragraphs = text.split('\n\n')
             current_chunk = []
             current_size = 0
             
             for para in paragraphs:
-                para_tokens = len(para.split())
+                para_tokens = count_tokens(para)
                 
                 if current_size + para_tokens > max_tokens and current_chunk:
                     chunk_content = f"[{hierarchy_text}]\n\n" + '\n\n'.join(current_chunk)
@@ -1,7 +1,10 @@
+import numpy as np
 import weaviate
-from sentence_transformers import SentenceTransformer
 from sqlalchemy.orm import Session
-from typing import List, Dict
+from functools import lru_cache
+from itertools import islice
+from operator import attrgetter
+from typing import Dict, Iterable, Iterator, List, Optional
 import sys
 import os
 from pathlib import Path
@@ -10,19 +13,49 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from db.session import SessionLocal
 from db.models import PolicyChunk
+from app.retrieval import load_encoder, EMBEDDING_BACKEND
 
 WEAVIATE_URL = os.getenv("WEAVIATE_URL", "http://localhost:8080")
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+ENCODE_BATCH_SIZE = 128
+INGEST_GROUP_SIZE = 512
+IMPORT_BATCH_SIZE = 500
+IMPORT_WORKERS = 4
+PQ_MIN_VECTORS = int(os.getenv("PQ_MIN_VECTORS", "10000"))
 
+HNSW_CONFIG = {
+    "distance": "cosine",
+    "ef": 64,
+    "efConstruction": 128,
+    "maxConnections": 16,
+    # Filtered searches matching fewer objects than this scan them exactly; larger allow-lists
+    # are walked through the graph until `limit` matches are found, so no overfetch is needed
+    "flatSearchCutoff": 40000
+}
+
+PQ_CONFIG = {
+    "enabled": True,
+    "segments": 96,
+    "centroids": 256,
+    "trainingLimit": 100000
+}
+
+@lru_cache(maxsize=1)
 def get_weaviate_client() -> weaviate.Client:
     client = weaviate.Client(url=WEAVIATE_URL)
     return client
 
+@lru_cache(maxsize=1)
+def get_embedding_model(model_name: str = EMBEDDING_MODEL, backend: str = EMBEDDING_BACKEND):
+    # Same encoder as the query path, so chunk and query vectors come from one model
+    return load_encoder(model_name, backend=backend)
+
 def create_schema(client: weaviate.Client):
     schema = {
         "class": "PolicyChunk",
         "description": "Policy document chunks with embeddings",
         "vectorizer": "none",
+        "vectorIndexConfig": HNSW_CONFIG,
         "properties": [
             {
                 "name": "chunk_id",
@@ -62,16 +95,25 @@ def create_schema(client: weaviate.Client):
             {
                 "name": "policy_source",
                 "dataType": ["text"],
+                "tokenization": "field",
+                "indexFilterable": True,
+                "indexSearchable": False,
                 "description": "Policy source platform (google, facebook, etc.)"
             },
             {
                 "name": "region",
                 "dataType": ["text"],
+                "tokenization": "field",
+                "indexFilterable": True,
+                "indexSearchable": False,
                 "description": "Applicable region (GLOBAL, US, EU, UK)"
             },
             {
                 "name": "content_type",
                 "dataType": ["text"],
+                "tokenization": "field",
+                "indexFilterable": True,
+                "indexSearchable": False,
                 "description": "Content type (AD_TEXT, IMAGE, VIDEO, LANDING_PAGE, GENERAL)"
             }
         ]
@@ -83,60 +125,133 @@ def create_schema(client: weaviate.Client):
     
     client.schema.create_class(schema)
     print("Schema created successfully")
+    
+    # Cached answers cite chunk_ids from the previous index
+    if client.schema.exists("QueryCache"):
+        print("Clearing cached answers...")
+        client.schema.delete_class("QueryCache")
 
-def load_chunks_from_db(db: Session) -> List[PolicyChunk]:
-    chunks = db.query(PolicyChunk).order_by(
+def enable_compression(client: weaviate.Client, total: int) -> bool:
+    """
+    Switch PolicyChunk to product quantization once enough vectors exist to train it.
+    
+    PQ codebooks are trained on the imported vectors, so it can only be enabled
+    after import. 96 segments x 256 centroids stores each 384-dim vector in 96
+    bytes instead of 1536; Weaviate keeps the full vectors on disk for rescoring.
+    """
+    if total < PQ_MIN_VECTORS:
+        print(f"Skipping PQ: {total} vectors < PQ_MIN_VECTORS ({PQ_MIN_VECTORS})")
+        return False
+    
+    client.schema.update_config("PolicyChunk", {"vectorIndexConfig": {"pq": PQ_CONFIG}})
+    print(f"PQ compression enabled ({PQ_CONFIG['segments']} segments, {PQ_CONFIG['centroids']} centroids)")
+    return True
+
+def load_chunks_from_db(db: Session) -> Iterator[PolicyChunk]:
+    """Stream chunks in INGEST_GROUP_SIZE row batches (server-side cursor) instead of loading them all."""
+    return db.query(PolicyChunk).order_by(
         PolicyChunk.doc_id, 
         PolicyChunk.chunk_index
-    ).all()
-    return chunks
+    ).yield_per(INGEST_GROUP_SIZE)
 
-def generate_embeddings(texts: List[str], model) -> List[List[float]]:
-    embeddings = model.encode(texts, show_progress_bar=True, batch_size=32)
-    embeddings_list = embeddings.tolist()
+def generate_embeddings(texts: List[str], model, show_progress_bar: bool = True) -> np.ndarray:
+    embeddings = model.encode(
+        texts,
+        batch_size=ENCODE_BATCH_SIZE,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=show_progress_bar
+    )
     
-    if len(embeddings_list) > 0:
-        assert len(embeddings_list[0]) == 384, (
-            f"Expected 384-dimensional embeddings, got {len(embeddings_list[0])}"
+    if len(embeddings) > 0:
+        assert embeddings.shape[1] == 384, (
+            f"Expected 384-dimensional embeddings, got {embeddings.shape[1]}"
         )
     
-    return embeddings_list
+    # Kept as an (N, 384) float32 array; the batch converts one row at a time on add
+    return embeddings
+
+def configure_batch(client: weaviate.Client):
+    # Dynamic sizing adapts to Weaviate's import rate; workers send batches in parallel
+    return client.batch.configure(
+        batch_size=IMPORT_BATCH_SIZE,
+        dynamic=True,
+        num_workers=IMPORT_WORKERS,
+        timeout_retries=3
+    )
+
+enum_values = attrgetter("policy_source.value", "region.value", "content_type.value")
+
+def chunk_properties(chunk: PolicyChunk, chunk_id: Optional[str] = None) -> Dict:
+    policy_source, region, content_type = enum_values(chunk)
+    return {
+        "chunk_id": chunk_id if chunk_id is not None else str(chunk.chunk_id),
+        "chunk_text": chunk.chunk_text,
+        "doc_id": chunk.doc_id,
+        "doc_url": chunk.doc_url if chunk.doc_url else "",
+        "policy_section": chunk.policy_section,
+        "policy_path": chunk.policy_path,
+        "policy_section_level": chunk.policy_section_level,
+        "policy_source": policy_source,
+        "region": region,
+        "content_type": content_type
+    }
 
-def ingest_chunks(client: weaviate.Client, chunks: List[PolicyChunk], embeddings: List[List[float]]):
-    print(f"Ingesting {len(chunks)} chunks into Weaviate...")
+def ingest_to_weaviate(
+    client: weaviate.Client,
+    chunks: Iterable[PolicyChunk],
+    model,
+    group_size: int = INGEST_GROUP_SIZE
+) -> int:
+    """
+    Encode and import chunks group by group through one Weaviate batch.
     
-    with client.batch as batch:
-        batch.batch_size = 100
-        
-        for chunk, embedding in zip(chunks, embeddings):
-            properties = {
-                "chunk_id": str(chunk.chunk_id),
-                "chunk_text": chunk.chunk_text,
-                "doc_id": chunk.doc_id,
-                "doc_url": chunk.doc_url if chunk.doc_url else "",
-                "policy_section": chunk.policy_section,
-                "policy_path": chunk.policy_path,
-                "policy_section_level": chunk.policy_section_level,
-                "policy_source": chunk.policy_source.value,
-                "region": chunk.region.value,
-                "content_type": chunk.content_type.value
-            }
+    Chunks are pulled from the iterable group_size at a time, encoded in a
+    single model.encode call (which length-sorts its input to limit padding)
+    and queued on the batch, so reading, encoding and importing form one
+    pipeline holding only a group of rows and vectors in memory.
+    """
+    print("Embedding and ingesting chunks into Weaviate...")
+    
+    chunks = iter(chunks)
+    total = 0
+    
+    with configure_batch(client) as batch:
+        while True:
+            group = list(islice(chunks, group_size))
+            if not group:
+                break
             
-            batch.add_data_object(
-                data_object=properties,
-                class_name="PolicyChunk",
-                uuid=str(chunk.chunk_id),
-                vector=embedding
+            embeddings = generate_embeddings(
+                [chunk.chunk_text for chunk in group],
+                model,
+                show_progress_bar=False
             )
+            
+            # Properties are ready before the loop, which only hands objects to the batch
+            chunk_ids = [str(chunk.chunk_id) for chunk in group]
+            properties = [chunk_properties(chunk, chunk_id) for chunk, chunk_id in zip(group, chunk_ids)]
+            
+            for chunk_id, props, embedding in zip(chunk_ids, properties, embeddings):
+                batch.add_data_object(
+                    data_object=props,
+                    class_name="PolicyChunk",
+                    uuid=chunk_id,
+                    vector=embedding
+                )
+            
+            total += len(group)
+            print(f"  {total} chunks queued")
     
     print("Ingestion complete")
+    return total
 
 def main():
     print("Starting embedding and ingestion process...")
-    print(f"Embedding model: {EMBEDDING_MODEL}")
+    print(f"Embedding model: {EMBEDDING_MODEL} ({EMBEDDING_BACKEND} backend)")
     
     print("\nLoading embedding model...")
-    model = SentenceTransformer(EMBEDDING_MODEL)
+    model = get_embedding_model()
     
     print("Connecting to Weaviate...")
     client = get_weaviate_client()
@@ -147,27 +262,22 @@ def main():
     print("\nLoading chunks from PostgreSQL...")
     db = SessionLocal()
     try:
-        chunks = load_chunks_from_db(db)
-        print(f"Loaded {len(chunks)} chunks")
+        chunk_count = db.query(PolicyChunk).count()
+        print(f"Found {chunk_count} chunks")
         
-        if len(chunks) == 0:
+        if chunk_count == 0:
             print("No chunks found in database. Run ingestion pipeline first.")
             return
         
-        print("\nGenerating embeddings...")
-        texts = [chunk.chunk_text for chunk in chunks]
-        embeddings = generate_embeddings(texts, model)
-        
-        print(f"Generated {len(embeddings)} embeddings")
-        print(f"Embedding dimension: {len(embeddings[0])}")
-        
-        print("\nIngesting into Weaviate...")
-        ingest_chunks(client, chunks, embeddings)
+        print("\nEmbedding and ingesting into Weaviate...")
+        ingest_to_weaviate(client, load_chunks_from_db(db), model)
         
         count = client.query.aggregate("PolicyChunk").with_meta_count().do()
         total = count['data']['Aggregate']['PolicyChunk'][0]['meta']['count']
         print(f"\nTotal chunks in Weaviate: {total}")
         
+        enable_compression(client, total)
+        
     finally:
         db.close()
 
@@ -1,11 +1,23 @@
 import os
 import time
 import json
+import re
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
+DOWNLOAD_WORKERS = 5
+POOL_SIZE = 10
+FETCH_RETRIES = 3
+HEADER_TAGS = ['h1', 'h2', 'h3', 'h4']
+SECTION_LINK_LOOKAHEAD = 3
+# Links to a specific policy page: contain adspolicy/answer/ but not answer_ anywhere
+POLICY_LINK_RE = re.compile(r"^(?!.*answer_).*adspolicy/answer/")
+
 POLICY_URLS = {
     "google_ads_base_hub": {
         "url": "https://support.google.com/adspolicy/answer/6008942",
@@ -34,13 +46,29 @@ POLICY_URLS = {
     }
 }
 
-def fetch_page(url, delay=2):
-    headers = {
+def get_session():
+    # One connection pool for every page: TCP+TLS handshakes are reused across fetches
+    session = requests.Session()
+    # Transient failures (connection resets, 429, 5xx) are retried with exponential backoff
+    retry = Retry(
+        total=FETCH_RETRIES,
+        backoff_factor=1,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET"})
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session.mount("https://", adapter)
+    session.headers.update({
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-    }
+    })
+    return session
+
+def fetch_page(url, delay=2, session=None):
+    if session is None:
+        session = get_session()
     
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = session.get(url, timeout=10)
         response.raise_for_status()
         time.sleep(delay)
         return response.text
@@ -48,9 +76,15 @@ def fetch_page(url, delay=2):
         print(f"Error fetching {url}: {e}")
         return None
 
-def extract_structured_text(html_content):
-    soup = BeautifulSoup(html_content, 'html.parser')
+def parse_html(html_content):
+    return BeautifulSoup(html_content, 'lxml')
+
+def extract_structured_text(soup):
+    # Raw HTML is still accepted for callers that have not parsed the page themselves
+    if isinstance(soup, str):
+        soup = parse_html(soup)
     
+    # Decomposes non-content tags in place: run after anything else that reads the soup
     for script in soup(["script", "style", "nav", "footer", "header"]):
         script.decompose()
     
@@ -102,8 +136,14 @@ def extract_metadata(soup, url, platform, category):
     if h1_tag and not metadata["title"]:
         metadata["title"] = h1_tag.get_text(strip=True)
     
+    # Walk the document once; each header's lookahead is a slice of this list
+    # (the same tag order find_next() follows) instead of a fresh tree walk.
+    # find_all(True) yields Tags only, so the walk needs no per-node type check
+    tags = soup.find_all(True)
+    positions = {id(tag): i for i, tag in enumerate(tags) if tag.name in HEADER_TAGS}
+    
     # Extract section hierarchy and their associated URLs
-    for header in soup.find_all(['h1', 'h2', 'h3', 'h4']):
+    for header in soup.find_all(HEADER_TAGS):
         section_text = header.get_text(strip=True)
         if section_text:
             metadata["sections"].append({
@@ -123,30 +163,24 @@ def extract_metadata(soup, url, platform, category):
             # Also check for "Learn more" or similar links in following paragraphs
             if not link:
                 # Look in the next few elements for policy links
-                current = header.find_next()
-                search_limit = 3
-                while current and search_limit > 0:
-                    if current.name in ['h1', 'h2', 'h3', 'h4']:
+                start = positions[id(header)] + 1
+                for current in tags[start:start + SECTION_LINK_LOOKAHEAD]:
+                    if current.name in HEADER_TAGS:
                         break  # Stop at next header
                     
-                    links = current.find_all('a', href=True) if hasattr(current, 'find_all') else []
-                    for l in links:
-                        href = l.get('href', '')
-                        # Look for policy-specific links (not general help center)
-                        if 'adspolicy/answer/' in href and 'answer_' not in href:
-                            # Convert relative URLs to absolute
-                            if href.startswith('http'):
-                                link = l
-                            elif href.startswith('/'):
-                                link = l
-                                href = f"https://support.google.com{href}"
-                                l['href'] = href
-                            break
+                    # First policy-specific link (not general help center), matched by the regex engine
+                    for l in current.find_all('a', href=POLICY_LINK_RE, limit=1):
+                        href = l['href']
+                        # Convert relative URLs to absolute
+                        if href.startswith('http'):
+                            link = l
+                        elif href.startswith('/'):
+                            link = l
+                            href = f"https://support.google.com{href}"
+                            l['href'] = href
                     
                     if link:
                         break
-                    current = current.find_next()
-                    search_limit -= 1
             
             # Store the URL if found
             if link and link.get('href'):
@@ -171,31 +205,45 @@ def save_document(content, filename, doc_type="html"):
     print(f"Saved: {filepath.name}")
     return filepath
 
+def _parse_one(html_content, url, platform, category):
+    # Runs in a worker process; metadata must be read before extract_structured_text strips tags
+    soup = parse_html(html_content)
+    metadata = extract_metadata(soup, url, platform, category)
+    return extract_structured_text(soup), metadata
+
 def download_policies():
     print("Starting policy document download...")
     
+    # Fetches are I/O-bound, so overlap them; fetch_page keeps its per-request politeness delay
+    with get_session() as session, ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+        html_pages = dict(zip(
+            POLICY_URLS,
+            executor.map(lambda info: fetch_page(info["url"], session=session), POLICY_URLS.values())
+        ))
+    
+    downloaded = []
     for policy_name, policy_info in POLICY_URLS.items():
-        url = policy_info["url"]
-        platform = policy_info["platform"]
-        category = policy_info["category"]
-        
-        print(f"\nFetching: {policy_name}")
-        
-        html_content = fetch_page(url)
+        html_content = html_pages[policy_name]
         
         if html_content:
             save_document(html_content, f"{policy_name}_raw", "html")
-            
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            text_content = extract_structured_text(html_content)
-            save_document(text_content, policy_name, "md")
-            
-            metadata = extract_metadata(soup, url, platform, category)
-            save_document(json.dumps(metadata, indent=2), f"{policy_name}_metadata", "json")
+            downloaded.append(policy_name)
         else:
             print(f"Failed to download: {policy_name}")
     
+    # Parsing is CPU-bound and holds the GIL, so spread documents across processes
+    items = [
+        (html_pages[name], POLICY_URLS[name]["url"], POLICY_URLS[name]["platform"], POLICY_URLS[name]["category"])
+        for name in downloaded
+    ]
+    with ProcessPoolExecutor() as executor:
+        parsed = executor.map(_parse_one, *zip(*items)) if items else []
+        
+        for policy_name, (text_content, metadata) in zip(downloaded, parsed):
+            print(f"\nProcessing: {policy_name}")
+            save_document(json.dumps(metadata, indent=2), f"{policy_name}_metadata", "json")
+            save_document(text_content, policy_name, "md")
+    
     print("\nDownload complete.")
 
 if __name__ == "__main__":
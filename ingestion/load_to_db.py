@@ -29,14 +29,19 @@ def load_chunks_to_db():
             
             print(f"\nLoading {chunk_file.name}: {len(chunks)} chunks")
             
+            # One key-only query per file instead of a full-row lookup per chunk
+            doc_ids = {chunk_data["doc_id"] for chunk_data in chunks}
+            existing_keys = {
+                (doc_id, chunk_index)
+                for doc_id, chunk_index in db.query(PolicyChunk.doc_id, PolicyChunk.chunk_index)
+                .filter(PolicyChunk.doc_id.in_(doc_ids))
+            }
+            
             for chunk_data in chunks:
-                exists = db.query(PolicyChunk).filter_by(
-                    doc_id=chunk_data["doc_id"],
-                    chunk_index=chunk_data["chunk_index"]
-                ).first()
-                
-                if exists:
+                key = (chunk_data["doc_id"], chunk_data["chunk_index"])
+                if key in existing_keys:
                     continue
+                existing_keys.add(key)
                 
                 chunk = PolicyChunk(
                     chunk_id=chunk_data['chunk_id'],
@@ -0,0 +1,139 @@
+import ast
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+
+RETRIEVAL_FUNCTIONS = {"retrieve_policy_chunks", "aretrieve_policy_chunks"}
+WEAVIATE_URL = "http://localhost:8080"
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "serial: writes to or rebuilds shared PostgreSQL/Weaviate state; run without xdist (-n0)"
+    )
+    if os.environ.get("PYTEST_XDIST_WORKER"):
+        # Each xdist worker loads its own encoder; one thread apiece keeps N workers from oversubscribing
+        # the cores. Set before app.retrieval is imported, which reads it into load_encoder's default
+        os.environ.setdefault("ENCODER_THREADS", "1")
+
+
+def pytest_collection_modifyitems(config, items):
+    if not hasattr(config, "workerinput"):
+        return
+    skip_serial = pytest.mark.skip(reason="serial test; run separately with: pytest -n0 -m serial")
+    for item in items:
+        if "serial" in item.keywords:
+            item.add_marker(skip_serial)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def no_semantic_cache():
+    """
+    Turn off the Weaviate-backed semantic answer cache for the session.
+    QueryCache outlives a test run, so from the second run on the generation
+    and API tests would get a stored answer and never reach the LLM or
+    citation validation. Session scope keeps it off for session fixtures too.
+    """
+    from app.cache import response_cache
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(response_cache, "lookup", lambda *args, **kwargs: None)
+        patch.setattr(response_cache, "store", lambda *args, **kwargs: None)
+        yield
+
+
+@pytest.fixture(scope="session")
+def weaviate_client():
+    """
+    One Weaviate client for the session. Constructing a client probes the
+    readiness and meta endpoints, so a client per test added round trips
+    that had nothing to do with what the tests check.
+    """
+    import weaviate
+    return weaviate.Client(WEAVIATE_URL)
+
+
+def literal_queries(path: Path) -> set:
+    """Query strings passed literally to the retrieval functions, or assigned to `query`, in a test module."""
+    queries = set()
+    for node in ast.walk(ast.parse(path.read_text(encoding="utf-8"))):
+        if isinstance(node, ast.Call) and node.args:
+            func = node.func
+            name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+            arg = node.args[0]
+            if name in RETRIEVAL_FUNCTIONS and isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                queries.add(arg.value)
+        elif isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+            if any(isinstance(t, ast.Name) and t.id == "query" for t in node.targets):
+                queries.add(node.value.value)
+    return queries
+
+
+@pytest.fixture(scope="module")
+def db():
+    """One SQLAlchemy session per test module, for tests that only read PostgreSQL."""
+    from db.session import SessionLocal
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+# Module scope, not session: the serial rebuild tests drop and re-ingest PolicyChunk, and the
+# alignment checks that run after them must compare against the live tables and index
+@pytest.fixture(scope="module")
+def postgres_chunk_ids():
+    """Every chunk_id in PostgreSQL as strings, read once per module (id column only)."""
+    from sqlalchemy import select
+    from db.session import SessionLocal
+    from db.models import PolicyChunk
+    session = SessionLocal()
+    try:
+        return frozenset(str(chunk_id) for chunk_id in session.execute(select(PolicyChunk.chunk_id)).scalars())
+    finally:
+        session.close()
+
+
+@pytest.fixture(scope="module")
+def weaviate_chunk_ids(weaviate_client):
+    """Every chunk_id stored in Weaviate, read once per module."""
+    result = weaviate_client.query.aggregate("PolicyChunk").with_meta_count().do()
+    count = result["data"]["Aggregate"]["PolicyChunk"][0]["meta"]["count"]
+    result = weaviate_client.query.get("PolicyChunk", ["chunk_id"]).with_limit(count).do()
+    return frozenset(chunk["chunk_id"] for chunk in result.get("data", {}).get("Get", {}).get("PolicyChunk", []))
+
+
+@pytest.fixture(scope="session")
+def retriever():
+    """
+    The process-wide retriever, built once per session. load_encoder already
+    runs a warm-up encode, so the model load and first forward pass are paid
+    here rather than inside whichever test happens to run first.
+    """
+    from app.retrieval import get_retriever
+    return get_retriever()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def warm_query_embeddings(request):
+    """
+    Embed every literal query of the collected retrieval tests in one batched
+    encoder pass, so individual tests hit the retriever's query vector cache.
+    """
+    paths = {Path(str(item.fspath)) for item in request.session.items}
+    paths = sorted(p for p in paths if p.name.startswith("test_retrieval_"))
+    if not paths:
+        return
+
+    queries = sorted(set().union(*(literal_queries(p) for p in paths)))
+    if queries:
+        try:
+            request.getfixturevalue("retriever").encode_queries(queries)
+        except Exception:
+            # Warm-up only; with the services down the retrieval tests report the failure themselves
+            pass
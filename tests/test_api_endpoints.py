@@ -7,10 +7,19 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from api.main import app
 
-client = TestClient(app)
+@pytest.fixture(scope="session")
+def client():
+    """
+    One TestClient for the whole session. Entering it runs the FastAPI lifespan
+    (encoder, Weaviate client, LLM batcher) once, and a throwaway query warms
+    the model so the first test does not pay the cold start.
+    """
+    with TestClient(app) as test_client:
+        test_client.post("/query", json={"query": "Can I advertise alcohol?", "limit": 1})
+        yield test_client
 
 
-def test_query_happy_path():
+def test_query_happy_path(client):
     """
     POST /query with valid question returns answer with citations.
     Validates end-to-end RAG pipeline through API.
@@ -37,7 +46,7 @@ def test_query_happy_path():
     assert len(citation["doc_url"]) > 0
 
 
-def test_query_refusal_path():
+def test_query_refusal_path(client):
     """
     POST /query with question outside policy scope triggers refusal.
     Validates hallucination prevention at API boundary.
@@ -57,7 +66,7 @@ def test_query_refusal_path():
     assert len(data["citations"]) == 0
 
 
-def test_missing_query_field():
+def test_missing_query_field(client):
     """
     POST /query without required query field returns validation error.
     Validates Pydantic schema enforcement.
@@ -70,7 +79,7 @@ def test_missing_query_field():
     assert response.status_code == 422
 
 
-def test_invalid_limit_negative():
+def test_invalid_limit_negative(client):
     """
     POST /query with negative limit returns validation error.
     Validates constraint enforcement on numeric fields.
@@ -83,7 +92,7 @@ def test_invalid_limit_negative():
     assert response.status_code == 422
 
 
-def test_invalid_limit_zero():
+def test_invalid_limit_zero(client):
     """
     POST /query with zero limit returns validation error.
     Validates minimum value constraint.
@@ -96,7 +105,7 @@ def test_invalid_limit_zero():
     assert response.status_code == 422
 
 
-def test_invalid_limit_too_large():
+def test_invalid_limit_too_large(client):
     """
     POST /query with limit exceeding maximum returns validation error.
     Validates maximum value constraint.
@@ -109,7 +118,7 @@ def test_invalid_limit_too_large():
     assert response.status_code == 422
 
 
-def test_query_too_short():
+def test_query_too_short(client):
     """
     POST /query with query below minimum length returns validation error.
     Validates string length constraints.
@@ -122,7 +131,7 @@ def test_query_too_short():
     assert response.status_code == 422
 
 
-def test_query_too_long():
+def test_query_too_long(client):
     """
     POST /query with query exceeding maximum length returns validation error.
     Validates string length upper bound.
@@ -136,7 +145,7 @@ def test_query_too_long():
     assert response.status_code == 422
 
 
-def test_html_page_loads():
+def test_html_page_loads(client):
     """
     GET / returns HTML frontend with expected content.
     Validates frontend wiring and static file serving.
@@ -148,7 +157,7 @@ def test_html_page_loads():
     assert "Policy-Aware RAG System" in response.text
 
 
-def test_health_endpoint():
+def test_health_endpoint(client):
     """
     GET /health returns system status.
     Validates health check endpoint and service dependencies.
@@ -164,7 +173,7 @@ def test_health_endpoint():
     assert "llm" in data
 
 
-def test_query_latency_under_threshold():
+def test_query_latency_under_threshold(client):
     """
     POST /query completes within reasonable time.
     Not a benchmark, just a sanity check for timeouts.
@@ -182,7 +191,7 @@ def test_query_latency_under_threshold():
     assert data["latency_ms"] < 300000
 
 
-def test_query_with_multiple_citations():
+def test_query_with_multiple_citations(client):
     """
     POST /query with broad question returns multiple citations.
     Validates retrieval returns diverse sources.
@@ -202,7 +211,7 @@ def test_query_with_multiple_citations():
         assert len(unique_urls) > 0
 
 
-def test_query_returns_metrics():
+def test_query_returns_metrics(client):
     """
     POST /query includes performance metrics in response.
     Validates observability data is present.
@@ -223,7 +232,7 @@ def test_query_returns_metrics():
     assert data["num_tokens_generated"] >= 0
 
 
-def test_query_with_optional_filters():
+def test_query_with_optional_filters(client):
     """
     POST /query accepts optional filter parameters.
     Validates optional fields are handled correctly.
@@ -239,3 +248,30 @@ def test_query_with_optional_filters():
     )
     
     assert response.status_code in [200, 422]
+
+
+def test_batch_returns_one_response_per_query(client):
+    """
+    POST /batch answers every query in request order within one HTTP call.
+    """
+    queries = ["Can I advertise alcohol?", "quantum teleportation advertising regulations"]
+    response = client.post(
+        "/batch",
+        json={"requests": [{"query": q, "limit": 3} for q in queries]}
+    )
+    
+    assert response.status_code == 200
+    
+    responses = response.json()["responses"]
+    assert len(responses) == len(queries)
+    assert responses[0]["refused"] is False
+    assert len(responses[0]["citations"]) > 0
+    assert responses[1]["refused"] is True
+
+
+def test_batch_rejects_empty_request_list(client):
+    """
+    POST /batch with no queries is a validation error, not an empty success.
+    """
+    response = client.post("/batch", json={"requests": []})
+    assert response.status_code == 422
@@ -5,6 +5,8 @@ from db.models import PolicyChunk
 import uuid
 from datetime import datetime
 
+pytestmark = pytest.mark.serial
+
 def test_duplicate_doc_id_chunk_index_fails():
     """
     Test that inserting duplicate (doc_id, chunk_index) violates UNIQUE constraint.
@@ -1,63 +1,38 @@
 import pytest
-import weaviate
 from sqlalchemy import func
-from db.session import SessionLocal
 from db.models import PolicyChunk
 
-def test_embedding_coverage():
+def test_embedding_coverage(db, weaviate_client):
     """
     Test that every PostgreSQL chunk has exactly one vector in Weaviate.
     """
-    db = SessionLocal()
-    client = weaviate.Client("http://localhost:8080")
+    client = weaviate_client
     
-    try:
-        pg_count = db.query(func.count(PolicyChunk.chunk_id)).scalar()
-        
-        result = client.query.aggregate("PolicyChunk").with_meta_count().do()
-        wv_count = result['data']['Aggregate']['PolicyChunk'][0]['meta']['count']
-        
-        assert pg_count == wv_count, (
-            f"Embedding coverage mismatch: PostgreSQL has {pg_count} chunks, "
-            f"Weaviate has {wv_count} vectors"
-        )
-        
-    finally:
-        db.close()
+    pg_count = db.query(func.count(PolicyChunk.chunk_id)).scalar()
+    
+    result = client.query.aggregate("PolicyChunk").with_meta_count().do()
+    wv_count = result['data']['Aggregate']['PolicyChunk'][0]['meta']['count']
+    
+    assert pg_count == wv_count, (
+        f"Embedding coverage mismatch: PostgreSQL has {pg_count} chunks, "
+        f"Weaviate has {wv_count} vectors"
+    )
 
-def test_no_missing_embeddings():
+def test_no_missing_embeddings(postgres_chunk_ids, weaviate_chunk_ids):
     """
     Test that no chunks are missing embeddings.
     """
-    db = SessionLocal()
-    client = weaviate.Client("http://localhost:8080")
+    missing_embeddings = postgres_chunk_ids - weaviate_chunk_ids
     
-    try:
-        pg_chunk_ids = set(
-            str(chunk_id) for (chunk_id,) in db.query(PolicyChunk.chunk_id).all()
-        )
-        
-        result = client.query.aggregate("PolicyChunk").with_meta_count().do()
-        wv_count = result['data']['Aggregate']['PolicyChunk'][0]['meta']['count']
-        
-        result = client.query.get("PolicyChunk", ["chunk_id"]).with_limit(wv_count).do()
-        wv_chunks = result.get("data", {}).get("Get", {}).get("PolicyChunk", [])
-        wv_chunk_ids = set(chunk["chunk_id"] for chunk in wv_chunks)
-        
-        missing_embeddings = pg_chunk_ids - wv_chunk_ids
-        
-        assert len(missing_embeddings) == 0, (
-            f"{len(missing_embeddings)} chunks missing embeddings: {list(missing_embeddings)[:10]}"
-        )
-        
-    finally:
-        db.close()
+    assert len(missing_embeddings) == 0, (
+        f"{len(missing_embeddings)} chunks missing embeddings: {list(missing_embeddings)[:10]}"
+    )
 
-def test_no_duplicate_vectors():
+def test_no_duplicate_vectors(weaviate_client):
     """
     Test that no chunk has multiple vectors in Weaviate.
     """
-    client = weaviate.Client("http://localhost:8080")
+    client = weaviate_client
     
     result = client.query.aggregate("PolicyChunk").with_meta_count().do()
     wv_count = result['data']['Aggregate']['PolicyChunk'][0]['meta']['count']
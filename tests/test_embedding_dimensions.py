@@ -1,12 +1,11 @@
 import pytest
-import weaviate
 from sentence_transformers import SentenceTransformer
 
-def test_embedding_dimensions():
+def test_embedding_dimensions(weaviate_client):
     """
     Test that all vectors in Weaviate have the expected dimension (384 for all-MiniLM-L6-v2).
     """
-    client = weaviate.Client("http://localhost:8080")
+    client = weaviate_client
     
     result = client.query.get(
         "PolicyChunk",
@@ -0,0 +1,87 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+from app.generation import DynBatcher
+
+
+@pytest.mark.asyncio
+async def test_concurrent_prompts_are_grouped_into_one_batch(mocker):
+    """
+    Test that prompts arriving within max_delay are dispatched as a single batch.
+    Each caller must still receive the completion for its own prompt.
+    """
+    calls = []
+
+    async def fake_completion(prompt, client=None, model_name=None):
+        calls.append(prompt)
+        return f"answer to {prompt}"
+
+    mocker.patch("app.generation.generate_completion", side_effect=fake_completion)
+    batch_spy = mocker.spy(DynBatcher, "_infer")
+
+    batcher = DynBatcher(max_batch_size=8, max_delay=0.05)
+    await batcher.start()
+    try:
+        answers = await asyncio.gather(*[
+            batcher.process_batched({"prompt": f"p{i}", "query": f"q{i}"})
+            for i in range(4)
+        ])
+    finally:
+        await batcher.stop()
+
+    assert answers == [f"answer to p{i}" for i in range(4)]
+    assert sorted(calls) == ["p0", "p1", "p2", "p3"]
+    assert batch_spy.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_failure_is_isolated_per_request(mocker):
+    """
+    Test that one failed generation does not fail the other requests in its batch.
+    """
+    async def fake_completion(prompt, client=None, model_name=None):
+        if prompt == "bad":
+            raise RuntimeError("generation failed")
+        return "ok"
+
+    mocker.patch("app.generation.generate_completion", side_effect=fake_completion)
+
+    batcher = DynBatcher(max_batch_size=2, max_delay=0.05)
+    await batcher.start()
+    try:
+        results = await asyncio.gather(
+            batcher.process_batched({"prompt": "good", "query": "good"}),
+            batcher.process_batched({"prompt": "bad", "query": "bad"}),
+            return_exceptions=True
+        )
+    finally:
+        await batcher.stop()
+
+    assert results[0] == "ok"
+    assert isinstance(results[1], RuntimeError)
+
+
+@pytest.mark.asyncio
+async def test_stop_fails_requests_of_batch_being_collected(mocker):
+    """
+    Test that stopping while a batch is still being collected fails its requests
+    instead of leaving their callers waiting forever.
+    """
+    generate = mocker.patch("app.generation.generate_completion")
+
+    batcher = DynBatcher(max_batch_size=8, max_delay=10)
+    await batcher.start()
+    request = asyncio.create_task(batcher.process_batched({"prompt": "p", "query": "q"}))
+    # Let the worker take the request off the queue and wait for more
+    await asyncio.sleep(0.05)
+    assert batcher._queue.empty()
+
+    await batcher.stop()
+
+    with pytest.raises(RuntimeError, match="batcher stopped"):
+        await asyncio.wait_for(request, timeout=1)
+    generate.assert_not_called()
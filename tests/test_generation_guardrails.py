@@ -4,15 +4,16 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 import pytest
-from app.generation import generate_policy_response
+from app.generation import generate_policy_response, build_prompt
 
 
-def test_generation_refuses_when_no_chunks():
+@pytest.mark.asyncio
+async def test_generation_refuses_when_no_chunks():
     """
     Test that generation refuses when no relevant policy chunks are found.
     This prevents hallucination - the system must fail closed without sources.
     """
-    response = generate_policy_response(
+    response = await generate_policy_response(
         query="quantum teleportation advertising regulations",
         limit=3
     )
@@ -21,13 +22,31 @@ def test_generation_refuses_when_no_chunks():
     assert response.refusal_reason is not None
 
 
-def test_generation_refuses_low_confidence(mocker):
+@pytest.mark.asyncio
+async def test_generation_refuses_blank_query_before_cache(mocker):
+    """
+    Test that a whitespace-only query is refused without touching the caches,
+    the encoder or retrieval. QueryRequest's min_length counts the spaces.
+    """
+    lookup = mocker.patch("app.generation._cache_lookup")
+    retrieve = mocker.patch("app.generation.aretrieve_policy_chunks")
+    
+    response = await generate_policy_response("     ")
+    
+    assert response.refused is True
+    assert "No relevant policies" in response.refusal_reason
+    lookup.assert_not_called()
+    retrieve.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_generation_refuses_low_confidence(mocker):
     """
     Test that generation refuses when retrieval confidence is below threshold.
     Even if chunks are returned, low similarity scores indicate weak matches.
     """
     mocker.patch(
-        "app.generation.retrieve_policy_chunks",
+        "app.generation.aretrieve_policy_chunks",
         return_value=[{
             "chunk_id": "test-id",
             "chunk_text": "irrelevant text",
@@ -38,12 +57,13 @@ def test_generation_refuses_low_confidence(mocker):
         }]
     )
     
-    response = generate_policy_response("random query")
+    response = await generate_policy_response("random query", use_cache=False)
     assert response.refused is True
     assert "Insufficient confidence" in response.refusal_reason
 
 
-def test_generation_requires_valid_citations(mocker):
+@pytest.mark.asyncio
+async def test_generation_requires_valid_citations(mocker):
     """
     Test that generation refuses when LLM cites sources that weren't retrieved.
     This prevents citation hallucination - all citations must reference actual chunks.
@@ -58,7 +78,7 @@ def test_generation_requires_valid_citations(mocker):
     }]
     
     mocker.patch(
-        "app.generation.retrieve_policy_chunks",
+        "app.generation.aretrieve_policy_chunks",
         return_value=mock_chunks
     )
     
@@ -67,17 +87,18 @@ def test_generation_requires_valid_citations(mocker):
         return_value={"fake-citation-id", "another-fake-id"}
     )
     
-    response = generate_policy_response("Can I advertise alcohol?")
+    response = await generate_policy_response("Can I advertise alcohol?", use_cache=False)
     assert response.refused is True
     assert "citation validation" in response.refusal_reason
 
 
-def test_generation_success_has_citations():
+@pytest.mark.asyncio
+async def test_generation_success_has_citations():
     """
     Test that successful generation includes at least one citation.
     This verifies the grounding requirement - answers must reference sources.
     """
-    response = generate_policy_response(
+    response = await generate_policy_response(
         query="Can I advertise alcohol?",
         limit=5
     )
@@ -88,11 +109,12 @@ def test_generation_success_has_citations():
     assert "[SOURCE:" in response.answer
 
 
-def test_generation_includes_metrics():
+@pytest.mark.asyncio
+async def test_generation_includes_metrics():
     """
     Test that response includes performance metrics for monitoring.
     """
-    response = generate_policy_response(
+    response = await generate_policy_response(
         query="Can I advertise alcohol?",
         limit=3
     )
@@ -103,3 +125,24 @@ def test_generation_includes_metrics():
     if not response.refused:
         assert response.num_tokens_generated is not None
         assert response.num_tokens_generated > 0
+
+
+def test_prompt_budget_drops_lowest_scored_sources(mocker):
+    """
+    Test that an over-budget prompt sheds its weakest sources first.
+    The highest-scored source is always kept so the model has something to cite.
+    """
+    mocker.patch("app.generation.count_tokens", side_effect=lambda text: len(text.split()))
+    results = [
+        {"chunk_id": "strong", "chunk_text": "alcohol " * 50, "score": 0.9},
+        {"chunk_id": "weak", "chunk_text": "alcohol " * 50, "score": 0.3},
+        {"chunk_id": "medium", "chunk_text": "alcohol " * 50, "score": 0.6}
+    ]
+    
+    prompt, kept = build_prompt("Can I advertise alcohol?", results, max_tokens=200)
+    
+    assert [r["chunk_id"] for r in kept] == ["strong", "medium"]
+    assert "SOURCE weak" not in prompt
+    
+    _, kept = build_prompt("Can I advertise alcohol?", results, max_tokens=1)
+    assert [r["chunk_id"] for r in kept] == ["strong"]
@@ -0,0 +1,70 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+from app.generation import stream_policy_response
+
+CHUNK_ID = "3f2b8c1e-0d4a-4e6b-9a7c-1b2d3e4f5a6b"
+
+MOCK_CHUNKS = [{
+    "chunk_id": CHUNK_ID,
+    "chunk_text": "Alcohol advertising is restricted.",
+    "score": 0.8,
+    "policy_path": "Restricted content > Alcohol",
+    "doc_id": "doc-1",
+    "doc_url": "https://example.com"
+}]
+
+
+def fake_stream(parts):
+    async def stream_completion(prompt, client=None, model_name=None):
+        for part in parts:
+            yield part
+    return stream_completion
+
+
+async def collect(query, mocker):
+    return [event async for event in stream_policy_response(query, use_cache=False, retriever=mocker.Mock())]
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_tokens_then_validated_citations(mocker):
+    """
+    Test that tokens are forwarded as they arrive and citations are validated
+    on the accumulated answer in a single final event.
+    """
+    mocker.patch("app.generation.aretrieve_policy_chunks", return_value=MOCK_CHUNKS)
+    mocker.patch(
+        "app.generation.stream_completion",
+        side_effect=fake_stream(["Alcohol ads are ", "restricted ", f"[SOURCE:{CHUNK_ID}]"])
+    )
+
+    events = await collect("Can I advertise alcohol?", mocker)
+
+    assert [e["event"] for e in events] == ["token", "token", "token", "done"]
+    final = events[-1]["data"]
+    assert final["refused"] is False
+    assert final["answer"] == "".join(e["data"] for e in events[:-1])
+    assert [c["chunk_id"] for c in final["citations"]] == [CHUNK_ID]
+
+
+@pytest.mark.asyncio
+async def test_stream_final_event_refuses_hallucinated_citations(mocker):
+    """
+    Test that a streamed answer citing an unretrieved chunk ends with a refusal.
+    Clients must treat the final event as authoritative over streamed tokens.
+    """
+    mocker.patch("app.generation.aretrieve_policy_chunks", return_value=MOCK_CHUNKS)
+    mocker.patch(
+        "app.generation.stream_completion",
+        side_effect=fake_stream(["Allowed [SOURCE:00000000-0000-0000-0000-000000000000]"])
+    )
+
+    events = await collect("Can I advertise alcohol?", mocker)
+
+    final = events[-1]
+    assert final["event"] == "done"
+    assert final["data"]["refused"] is True
+    assert "citation validation" in final["data"]["refusal_reason"]
@@ -1,47 +1,40 @@
 import pytest
-import weaviate
-from db.session import SessionLocal
 from db.models import PolicyChunk
 
-def test_weaviate_object_id_equals_chunk_id():
+def test_weaviate_object_id_equals_chunk_id(db, weaviate_client):
     """
     Test that Weaviate object ID (UUID) equals PostgreSQL chunk_id.
     This is critical for hybrid retrieval join operations.
     """
-    db = SessionLocal()
-    client = weaviate.Client("http://localhost:8080")
+    client = weaviate_client
     
-    try:
-        pg_chunks = db.query(PolicyChunk.chunk_id).limit(10).all()
+    pg_chunks = db.query(PolicyChunk.chunk_id).limit(10).all()
+    
+    for (pg_chunk_id,) in pg_chunks:
+        result = client.data_object.get_by_id(
+            str(pg_chunk_id),
+            class_name="PolicyChunk"
+        )
+        
+        assert result is not None, (
+            f"Weaviate object with ID {pg_chunk_id} not found"
+        )
+        
+        assert result["id"] == str(pg_chunk_id), (
+            f"Weaviate object ID mismatch: expected {pg_chunk_id}, got {result['id']}"
+        )
         
-        for (pg_chunk_id,) in pg_chunks:
-            result = client.data_object.get_by_id(
-                str(pg_chunk_id),
-                class_name="PolicyChunk"
-            )
-            
-            assert result is not None, (
-                f"Weaviate object with ID {pg_chunk_id} not found"
-            )
-            
-            assert result["id"] == str(pg_chunk_id), (
-                f"Weaviate object ID mismatch: expected {pg_chunk_id}, got {result['id']}"
-            )
-            
-            assert result["properties"]["chunk_id"] == str(pg_chunk_id), (
-                f"chunk_id property mismatch: expected {pg_chunk_id}, "
-                f"got {result['properties']['chunk_id']}"
-            )
-            
-    finally:
-        db.close()
+        assert result["properties"]["chunk_id"] == str(pg_chunk_id), (
+            f"chunk_id property mismatch: expected {pg_chunk_id}, "
+            f"got {result['properties']['chunk_id']}"
+        )
 
-def test_metadata_fields_stored():
+def test_metadata_fields_stored(weaviate_client):
     """
     Test that policy_source, region, content_type, and policy_section_level are stored in Weaviate.
     These fields are required for hybrid retrieval filtering and ranking.
     """
-    client = weaviate.Client("http://localhost:8080")
+    client = weaviate_client
     
     result = client.query.get(
         "PolicyChunk",
@@ -72,12 +65,12 @@ def test_metadata_fields_stored():
         f"Invalid policy_section_level: {chunk['policy_section_level']}"
     )
 
-def test_filtering_by_metadata():
+def test_filtering_by_metadata(weaviate_client):
     """
     Test that we can filter chunks by region and content_type in Weaviate.
     This validates hybrid retrieval filtering capability.
     """
-    client = weaviate.Client("http://localhost:8080")
+    client = weaviate_client
     
     result = client.query.get(
         "PolicyChunk",
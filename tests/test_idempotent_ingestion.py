@@ -5,6 +5,8 @@ from sqlalchemy import func
 from db.session import SessionLocal
 from db.models import PolicyChunk
 
+pytestmark = pytest.mark.serial
+
 def test_idempotent_ingestion():
     """
     Test that running load_to_db.py twice does not increase row count.
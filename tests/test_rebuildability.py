@@ -1,19 +1,20 @@
 import pytest
 import subprocess
 import sys
-import weaviate
 from sqlalchemy import func
 from db.session import SessionLocal
 from db.models import PolicyChunk
 from sentence_transformers import SentenceTransformer
 
-def test_rebuildability():
+pytestmark = pytest.mark.serial
+
+def test_rebuildability(weaviate_client):
     """
     Test that Weaviate index can be deleted and rebuilt from PostgreSQL.
     This validates that PostgreSQL is the canonical source.
     """
     db = SessionLocal()
-    client = weaviate.Client("http://localhost:8080")
+    client = weaviate_client
     
     try:
         pg_count_before = db.query(func.count(PolicyChunk.chunk_id)).scalar()
@@ -56,12 +57,12 @@ def test_rebuildability():
     finally:
         db.close()
 
-def test_retrieval_after_rebuild():
+def test_retrieval_after_rebuild(weaviate_client):
     """
     Test that semantic search still works after rebuilding Weaviate.
     """
     model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
-    client = weaviate.Client("http://localhost:8080")
+    client = weaviate_client
     
     query = "Can I advertise alcohol?"
     query_vector = model.encode(query).tolist()
@@ -0,0 +1,92 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+from app.cache import ResponseCache, RetrievalCache, normalize_query, cache_scope
+from app.schemas import PolicyResponse
+
+
+def test_exact_cache_evicts_least_recently_used():
+    """
+    Test that the in-process tier keeps the most recently used answers.
+    A read refreshes an entry so it survives the next eviction.
+    """
+    cache = ResponseCache(maxsize=2)
+    first = PolicyResponse(answer="first", refused=False)
+    second = PolicyResponse(answer="second", refused=False)
+    third = PolicyResponse(answer="third", refused=False)
+
+    cache.put("a", first)
+    cache.put("b", second)
+    assert cache.get("a") is first
+
+    cache.put("c", third)
+
+    assert cache.get("a") is first
+    assert cache.get("b") is None
+    assert cache.get("c") is third
+
+
+def test_cache_keys_ignore_case_and_whitespace_but_not_filters():
+    """
+    Test that trivially different phrasings share a key while different filters do not.
+    """
+    assert normalize_query("  Can I advertise   ALCOHOL? ") == normalize_query("can i advertise alcohol?")
+    assert cache_scope(5, region=" Global ") == cache_scope(5, region="global")
+    assert cache_scope(5, region="global") != cache_scope(5, region="us")
+    assert cache_scope(5) != cache_scope(3)
+
+
+def test_retrieval_cache_matches_nearby_queries_within_scope():
+    """
+    Test that a query close to a stored centroid reuses its results, while a
+    distant query, another scope or an expired entry misses.
+    """
+    cache = RetrievalCache(min_similarity=0.86, ttl=60)
+    results = [{"chunk_id": "a"}, {"chunk_id": "b"}]
+    scope = cache_scope(5, region="global")
+
+    cache.store([1.0, 0.0, 0.0], scope, results)
+
+    assert cache.lookup([0.95, 0.1, 0.0], scope) == results
+    assert cache.lookup([0.0, 1.0, 0.0], scope) is None
+    assert cache.lookup([1.0, 0.0, 0.0], cache_scope(5, region="us")) is None
+
+    expired = RetrievalCache(ttl=0)
+    expired.store([1.0, 0.0, 0.0], scope, results)
+    assert expired.lookup([1.0, 0.0, 0.0], scope) is None
+
+
+def test_semantic_cache_throttles_touch_and_eviction(mocker):
+    """
+    Test that a hit only rewrites last_used once it is older than touch_interval,
+    and that inserts only count and trim QueryCache every evict_every stores.
+    """
+    cache = ResponseCache(touch_interval=300, evict_every=3)
+    cache._schema_ready = True
+    client = mocker.Mock()
+    hit = {
+        "answer": "cached",
+        "citations": "[]",
+        "num_tokens_generated": 1,
+        "_additional": {"id": "hit-id", "distance": 0.0}
+    }
+    client.query.get.return_value.with_near_vector.return_value.with_where.return_value \
+        .with_limit.return_value.do.return_value = {"data": {"Get": {"QueryCache": [hit]}}}
+
+    hit["last_used"] = time.time()
+    assert cache.lookup(client, [1.0, 0.0], "5|||").answer == "cached"
+    client.data_object.update.assert_not_called()
+
+    hit["last_used"] = time.time() - 301
+    cache.lookup(client, [1.0, 0.0], "5|||")
+    client.data_object.update.assert_called_once()
+
+    evict = mocker.patch.object(cache, "_evict")
+    response = PolicyResponse(answer="a", refused=False)
+    for _ in range(5):
+        cache.store(client, [1.0, 0.0], "5|||", "q", response)
+    assert evict.call_count == 1
@@ -14,12 +14,11 @@ from app.retrieval import retrieve_policy_chunks, get_retriever
 
 
 class TestRecallProtection:
-    """Test 15: Recall protection test (overfetch justification)"""
+    """Test 15: Recall protection test (filtered search)"""
     
     def test_overfetch_improves_recall_with_filters(self):
-        # This test demonstrates why overfetch is necessary
-        # We can't easily disable overfetch in the current implementation,
-        # but we can verify that filtering doesn't lose all results
+        # Filters are applied inside the HNSW traversal, which keeps walking
+        # until `limit` matches exist, so filtering must not lose all results
         
         query = "advertising policy"
         
@@ -31,15 +30,14 @@ class TestRecallProtection:
         )
         
         # Should still get results even with filter
-        # The overfetch mechanism (3x) ensures this
-        assert len(results_filtered) > 0, "Overfetch should prevent empty results after filtering"
+        assert len(results_filtered) > 0, "Filtered search should not return empty results"
         
         # Verify all results actually match the filter
         for result in results_filtered:
             assert result["region"] == "global", "All results should match filter"
     
     def test_overfetch_enables_diverse_results(self):
-        # Overfetch should allow us to get diverse results after filtering
+        # Filtered search should still return diverse results
         results = retrieve_policy_chunks(
             "content policy",
             limit=5,
@@ -101,13 +99,13 @@ class TestPolicyPathRelevance:
 class TestLatencyBudget:
     """Test 17: Latency budget test (production realism)"""
     
-    def test_retrieval_completes_within_budget(self):
+    def test_retrieval_completes_within_budget(self, retriever):
         # For a small corpus (67 chunks), retrieval should be fast
         # Set budget: 2 seconds (generous for small corpus)
         budget_ms = 2000
         
         start_time = time.time()
-        results = retrieve_policy_chunks("advertising policy", limit=10)
+        results = retrieve_policy_chunks("advertising policy", limit=10, retriever=retriever)
         end_time = time.time()
         
         latency_ms = (end_time - start_time) * 1000
@@ -115,7 +113,7 @@ class TestLatencyBudget:
         assert latency_ms < budget_ms, f"Retrieval took {latency_ms:.2f}ms, budget was {budget_ms}ms"
         assert len(results) > 0, "Should return results"
     
-    def test_filtered_query_latency(self):
+    def test_filtered_query_latency(self, retriever):
         # Filtered queries should also be fast
         budget_ms = 2000
         
@@ -124,7 +122,8 @@ class TestLatencyBudget:
             "content moderation",
             limit=5,
             region="global",
-            content_type="general"
+            content_type="general",
+            retriever=retriever
         )
         end_time = time.time()
         
@@ -175,10 +174,9 @@ class TestProductionReadiness:
             results = retrieve_policy_chunks(query, limit=3)
             assert isinstance(results, list), f"Should handle unicode in: {query}"
     
-    def test_concurrent_retrieval_safety(self):
+    def test_concurrent_retrieval_safety(self, retriever):
         # Singleton pattern should be thread-safe for reads
         # (This is a basic check; full concurrency testing needs threading)
-        retriever = get_retriever()
         
         # Multiple calls should return same instance
         assert get_retriever() is retriever
@@ -9,7 +9,9 @@ from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
 
-from app.retrieval import retrieve_policy_chunks, get_retriever
+import numpy as np
+
+from app.retrieval import retrieve_policy_chunks, get_retriever, HybridRetriever
 
 
 class TestVectorRetrieval:
@@ -89,7 +91,7 @@ class TestSQLFiltering:
 
 
 class TestOverfetchMechanism:
-    """Test 4: Overfetch prevents empty results after filtering"""
+    """Test 4: Filtered index search returns results without overfetch"""
     
     def test_overfetch_provides_results_after_filtering(self):
         # Test with global region (should have results)
@@ -99,7 +101,7 @@ class TestOverfetchMechanism:
             region="global"
         )
         
-        assert len(results) > 0, "Overfetch should provide results after filtering"
+        assert len(results) > 0, "Filtered search should provide results"
         assert len(results) <= 5, f"Should respect limit=5, got {len(results)}"
     
     def test_no_false_positives_in_filtered_results(self):
@@ -212,5 +214,47 @@ class TestDeterministicRetrieval:
         assert chunk_ids1 == chunk_ids2, "Filtered queries should be deterministic"
 
 
+class TestQueryEmbeddingCache:
+    """Test 9: Repeated queries reuse the cached embedding"""
+    
+    def test_repeated_query_is_encoded_once(self, mocker):
+        model = mocker.Mock()
+        model.encode.return_value = np.full(384, 0.5, dtype=np.float32)
+        retriever = HybridRetriever(model=model, weaviate_client=mocker.Mock())
+        
+        first = retriever.encode_query("Can I advertise alcohol?")
+        second = retriever.encode_query("  can i advertise ALCOHOL?  ")
+        
+        assert first == second
+        assert len(first) == 384
+        model.encode.assert_called_once_with("can i advertise alcohol?")
+    
+    def test_long_query_is_cut_to_the_token_window(self, mocker):
+        model = mocker.Mock()
+        model.encode.return_value = np.zeros(384, dtype=np.float32)
+        retriever = HybridRetriever(model=model, weaviate_client=mocker.Mock())
+        
+        retriever.encode_query("advertising " * 1000)
+        
+        assert model.encode.call_args.args[0] == " ".join(["advertising"] * 256)
+    
+    def test_batch_encodes_only_uncached_queries_once(self, mocker):
+        model = mocker.Mock()
+        model.encode.side_effect = lambda texts, **kwargs: (
+            np.full(384, 0.5, dtype=np.float32) if isinstance(texts, str)
+            else np.arange(len(texts) * 384, dtype=np.float32).reshape(len(texts), 384)
+        )
+        retriever = HybridRetriever(model=model, weaviate_client=mocker.Mock())
+        retriever.encode_query("advertising policy")
+        
+        vectors = retriever.encode_queries(["Advertising policy", "alcohol ads", "crypto ads"])
+        
+        assert len(vectors) == 3
+        assert model.encode.call_count == 2
+        assert model.encode.call_args.args[0] == ["alcohol ads", "crypto ads"]
+        assert retriever.encode_query("crypto ads") == vectors[2]
+        assert model.encode.call_count == 2
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -3,13 +3,14 @@ Failure and edge-case tests for hybrid retrieval (Step 5).
 Tests 9-11: Robustness and defensive programming.
 """
 
+import numpy as np
 import pytest
 import sys
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
 
-from app.retrieval import retrieve_policy_chunks
+from app.retrieval import retrieve_policy_chunks, HybridRetriever
 from db.models import Region, ContentType, PolicySource
 
 
@@ -78,6 +79,19 @@ class TestEmptyQuery:
         results = retrieve_policy_chunks("   ", limit=5)
         
         assert isinstance(results, list), "Should handle whitespace-only queries"
+    
+    def test_blank_query_skips_encoder_and_search(self, mocker):
+        model = mocker.Mock()
+        client = mocker.Mock()
+        retriever = HybridRetriever(model=model, weaviate_client=client)
+        
+        assert retriever.retrieve("  \n ", limit=5, region="global") == []
+        assert retriever.retrieve("   ", limit=5, query_vector=[0.1] * 384) == []
+        model.encode.assert_not_called()
+        client.query.raw.assert_not_called()
+        
+        with pytest.raises(ValueError):
+            retriever.retrieve("", limit=5, region="mars")
 
 
 class TestExtremeValues:
@@ -99,6 +113,20 @@ class TestExtremeValues:
         # Should not crash, should return available results (max 67 in our corpus)
         assert len(results) <= 67, "Should not return more results than exist in corpus"
     
+    def test_limit_clamped_to_corpus_size(self, mocker):
+        client = mocker.Mock()
+        client.query.raw.side_effect = [
+            {"data": {"Aggregate": {"PolicyChunk": [{"meta": {"count": 3}}]}}},
+            {"data": {"Get": {"PolicyChunk": []}}}
+        ]
+        model = mocker.Mock()
+        model.encode.return_value = np.zeros(384, dtype=np.float32)
+        retriever = HybridRetriever(model=model, weaviate_client=client)
+        
+        retriever.retrieve("policy", limit=1000)
+        
+        assert "limit: 3 " in client.query.raw.call_args.args[0]
+    
     def test_very_long_query(self):
         # Very long query
         long_query = "advertising " * 200
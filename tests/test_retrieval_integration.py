@@ -10,59 +10,27 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from app.retrieval import retrieve_policy_chunks
-from db.session import SessionLocal
-from db.models import PolicyChunk
-import weaviate
 
 
+@pytest.mark.serial
 class TestPostgresWeaviateAlignment:
     """Test 12: Postgres-Weaviate ID alignment"""
     
-    def test_all_returned_chunks_exist_in_postgres(self):
+    def test_all_returned_chunks_exist_in_postgres(self, postgres_chunk_ids):
         results = retrieve_policy_chunks("advertising policy", limit=10)
         
         assert len(results) > 0, "Need results to test alignment"
         
-        db = SessionLocal()
-        try:
-            returned_chunk_ids = [r["chunk_id"] for r in results]
-            
-            # Query PostgreSQL for these chunk_ids
-            postgres_chunks = db.query(PolicyChunk).filter(
-                PolicyChunk.chunk_id.in_(returned_chunk_ids)
-            ).all()
-            
-            postgres_chunk_ids = {str(chunk.chunk_id) for chunk in postgres_chunks}
-            
-            for chunk_id in returned_chunk_ids:
-                assert chunk_id in postgres_chunk_ids, f"chunk_id {chunk_id} not found in PostgreSQL"
-        finally:
-            db.close()
-    
-    def test_no_orphan_vectors_in_weaviate(self):
-        # Get all Weaviate chunk_ids
-        client = weaviate.Client(url="http://localhost:8080")
+        returned_chunk_ids = [r["chunk_id"] for r in results]
         
-        result = client.query.get(
-            "PolicyChunk",
-            ["chunk_id"]
-        ).with_limit(100).do()
-        
-        weaviate_chunks = result.get("data", {}).get("Get", {}).get("PolicyChunk", [])
-        weaviate_chunk_ids = {chunk["chunk_id"] for chunk in weaviate_chunks}
+        for chunk_id in returned_chunk_ids:
+            assert chunk_id in postgres_chunk_ids, f"chunk_id {chunk_id} not found in PostgreSQL"
+    
+    def test_no_orphan_vectors_in_weaviate(self, weaviate_chunk_ids, postgres_chunk_ids):
+        # Every Weaviate ID should exist in PostgreSQL
+        orphan_ids = weaviate_chunk_ids - postgres_chunk_ids
         
-        # Get all PostgreSQL chunk_ids
-        db = SessionLocal()
-        try:
-            postgres_chunks = db.query(PolicyChunk.chunk_id).all()
-            postgres_chunk_ids = {str(chunk.chunk_id) for chunk in postgres_chunks}
-            
-            # Every Weaviate ID should exist in PostgreSQL
-            orphan_ids = weaviate_chunk_ids - postgres_chunk_ids
-            
-            assert len(orphan_ids) == 0, f"Found {len(orphan_ids)} orphan vectors in Weaviate"
-        finally:
-            db.close()
+        assert len(orphan_ids) == 0, f"Found {len(orphan_ids)} orphan vectors in Weaviate"
 
 
 class TestLimitRespected: